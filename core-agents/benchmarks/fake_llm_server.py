@@ -0,0 +1,220 @@
+"""
+Local stand-in for the OpenAI chat completions and embeddings APIs.
+
+Answers with canned JSON matching WeeklyContentStrategy, WeeklyTweetsPlan and
+OptimizedWeeklyContent, with configurable latency and token rate, so the
+service can be benchmarked without credits or provider variance.
+
+    python -m benchmarks.fake_llm_server --port 9000 --latency-ms 600 --tokens-per-second 80
+    OPENAI_API_BASE=http://localhost:9000/v1 OPENAI_API_KEY=fake uvicorn src.main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+
+CONFIG = {
+    "latency_ms": 500.0,
+    "latency_sigma": 0.3,
+    "latency_dist": "lognormal",
+    "tokens_per_second": 100.0,
+    "seed": None,
+}
+
+CONTENT_TYPES = ["educational", "inspirational", "entertaining"]
+
+
+def _tweet(topic, index):
+    return {
+        "tweet_text": f"Hook #{index + 1} about {topic}: one clear, useful idea you can apply today. Try it and share what happens!",
+        "content_type": CONTENT_TYPES[index % len(CONTENT_TYPES)],
+    }
+
+
+def _topic(prompt):
+    match = re.search(r"Topic: (.+)", prompt)
+    return match.group(1).strip() if match else "the topic"
+
+
+def canned_response(prompt: str) -> dict:
+    """Pick the schema the prompt asks for and return matching JSON."""
+    topic = _topic(prompt)
+    
+    if "rejected one tweet" in prompt:
+        return {**_tweet(topic, 0), "tweet_text": f"A fresh take on {topic}: the one habit that compounds. Start small today and tell me how it goes!"}
+    
+    if "Optimizer" in prompt:
+        count = int((re.search(r"Return (\d+) polished", prompt) or [None, 5])[1])
+        return {
+            "weekly_tweets": [_tweet(topic, i) for i in range(count)],
+            "key_tips": f"Post about {topic} in the morning, reply to every comment in the first hour and pin the best performer.",
+        }
+    
+    if "Content Creator" in prompt:
+        count = int((re.search(r"Create (\d+)", prompt) or [None, 5])[1])
+        return {"tweets": [_tweet(topic, i) for i in range(count)]}
+    
+    return {
+        "main_topic": topic,
+        "target_audience": f"Busy professionals curious about {topic}",
+        "content_angles": ["Practical how-to", "Common mistakes", "Success stories"],
+    }
+
+
+def sample_latency() -> float:
+    """Seconds before the first token, from the configured distribution."""
+    mean = CONFIG["latency_ms"] / 1000
+    if CONFIG["latency_dist"] == "fixed":
+        return mean
+    if CONFIG["latency_dist"] == "uniform":
+        return random.uniform(0, 2 * mean)
+    return random.lognormvariate(0, CONFIG["latency_sigma"]) * mean
+
+
+def _prompt_text(messages) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def _count_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for load shaping
+    return max(1, len(text) // 4)
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]}
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    """
+    Deterministic random unit vector per input: identical topics match,
+    different ones are near-orthogonal (semantic cache misses).
+    """
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dimensions = body.get("dimensions") or 1536
+    data = []
+    
+    for index, item in enumerate(inputs):
+        seed = int.from_bytes(hashlib.sha256(json.dumps(item).encode("utf-8")).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        
+        if body.get("encoding_format") == "base64":
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+    
+    tokens = sum(_count_tokens(json.dumps(item)) for item in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = _prompt_text(body.get("messages", []))
+    content = json.dumps(canned_response(prompt))
+    model = body.get("model", "gpt-4o-mini")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    usage = {
+        "prompt_tokens": _count_tokens(prompt),
+        "completion_tokens": _count_tokens(content),
+        "total_tokens": _count_tokens(prompt) + _count_tokens(content),
+    }
+    
+    await asyncio.sleep(sample_latency())
+    
+    if not body.get("stream"):
+        # Non-streaming: pay the generation time up front
+        await asyncio.sleep(usage["completion_tokens"] / CONFIG["tokens_per_second"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+    
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+    
+    async def event_stream():
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if chunk_usage is None else [],
+            }
+            if chunk_usage is not None:
+                payload["usage"] = chunk_usage
+            return f"data: {json.dumps(payload)}\n\n"
+        
+        yield chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(content), 4):
+            await asyncio.sleep(1 / CONFIG["tokens_per_second"])
+            yield chunk({"content": content[start:start + 4]})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, chunk_usage=usage)
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"], help="Mean time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=CONFIG["latency_sigma"], help="Spread of the lognormal distribution")
+    parser.add_argument("--latency-dist", choices=["lognormal", "uniform", "fixed"], default=CONFIG["latency_dist"])
+    parser.add_argument("--tokens-per-second", type=float, default=CONFIG["tokens_per_second"])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    CONFIG.update(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        latency_dist=args.latency_dist,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
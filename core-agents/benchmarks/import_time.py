@@ -0,0 +1,70 @@
+"""
+Import-time budget check for the FastAPI app: imports src.main in a fresh
+interpreter under `python -X importtime`, prints the slowest top-level
+imports and fails when the total is over budget or a heavy module
+(langchain, langgraph, the LLM SDKs, numpy) was imported eagerly.
+    
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 1.0 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def run_importtime(module: str) -> list:
+    """(cumulative seconds, depth, module name) for every import, in import order."""
+    env = dict(os.environ, IMPORT_TIME_BUDGET_STRICT="0")
+    env.setdefault("OPENAI_API_KEY", "fake")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            imports.append((int(match.group(2)) / 1e6, len(match.group(3)) // 2, match.group(4)))
+    return imports
+
+
+def main():
+    from src.controller.services.startup import HEAVY_MODULES
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_S", "1.5")),
+                        help="seconds (default IMPORT_TIME_BUDGET_S or 1.5)")
+    parser.add_argument("--top", type=int, default=10, help="how many of the slowest direct imports to list")
+    args = parser.parse_args()
+    
+    imports = run_importtime(args.module)
+    total = next(seconds for seconds, _, name in reversed(imports) if name == args.module)
+    target_depth = next(depth for _, depth, name in reversed(imports) if name == args.module)
+    
+    # Direct children of the app module, by cumulative time
+    children = [(seconds, name) for seconds, depth, name in imports if depth == target_depth + 1]
+    print(f"{args.module}: {total:.3f}s (budget {args.budget}s)")
+    for seconds, name in sorted(children, reverse=True)[:args.top]:
+        print(f"  {seconds:8.3f}s  {name}")
+    
+    imported = {name for _, _, name in imports}
+    eager = [name for name in HEAVY_MODULES if name in imported]
+    if eager:
+        print(f"heavy modules imported eagerly: {', '.join(eager)}")
+    
+    if total > args.budget or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Prompt token report: renders every agent's prompt in the verbose and compact
+PROMPT_STYLE with realistic state and counts tokens with the model's tokenizer.
+
+Also reports the static prefix of each prompt (everything before the first
+variable part), which is what provider-side prompt caching can reuse.
+
+    python -m benchmarks.prompt_tokens
+    python -m benchmarks.prompt_tokens --encoding o200k_base --json
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+from benchmarks.fake_llm_server import canned_response
+
+TOPIC = "AI automation for small businesses"
+MARKER = "\x00"
+
+
+def get_counter(encoding_name: str):
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(encoding_name)
+        return lambda text: len(encoding.encode(text)), encoding_name
+    except Exception as e:
+        # tiktoken downloads its encodings on first use
+        print(f"tiktoken unavailable ({e}), estimating 4 chars per token", file=sys.stderr)
+        return lambda text: max(1, len(text) // 4), "chars/4"
+
+
+def render_prompts(style: str) -> dict:
+    """Rendered prompt of each agent, with MARKER in place of the variable parts."""
+    os.environ["PROMPT_STYLE"] = style
+    # Compare the in-prompt format instructions; native structured output sends none
+    os.environ["STRUCTURED_OUTPUT"] = "prompt"
+
+    from src.controller.promtps import prompt_format
+    from src.controller.promtps import content_strategist_prompt, tweet_creator_prompt, quality_optimizer_prompt
+    from src.model import agents
+
+    for module in (content_strategist_prompt, tweet_creator_prompt, quality_optimizer_prompt):
+        importlib.reload(module)
+
+    def instructions(model):
+        value = prompt_format.format_instructions(model)
+        return value() if callable(value) else value
+
+    strategy = canned_response(f"Content Strategist\nTopic: {TOPIC}")
+    tweets = canned_response(f"Content Creator\nTopic: {TOPIC}\nCreate 5 tweets")
+
+    prompts = {
+        "content_strategist": (
+            content_strategist_prompt.CONTENT_STRATEGIST_PROMPT(instructions(agents.WeeklyContentStrategy)),
+            {"topic_context": TOPIC},
+        ),
+        "tweet_creator": (
+            tweet_creator_prompt.TWEET_CREATOR_PROMPT(instructions(agents.WeeklyTweetsPlan)),
+            {
+                "weekly_strategy": prompt_format.serialize_state(strategy),
+                "topic_context": TOPIC,
+                "content_angle": strategy["content_angles"][0],
+                "tweet_count": 2,
+            },
+        ),
+        "quality_optimizer": (
+            quality_optimizer_prompt.QUALITY_OPTIMIZER_PROMPT(instructions(agents.OptimizedWeeklyContent)),
+            {"generated_tweets": prompt_format.serialize_state(tweets), "tweet_count": 5, "topic_context": TOPIC},
+        ),
+    }
+
+    rendered = {}
+    for agent, (prompt, inputs) in prompts.items():
+        full = prompt.format(**inputs)
+        marked = prompt.format(**{name: MARKER for name in inputs})
+        rendered[agent] = {"full": full, "static_prefix": marked.split(MARKER, 1)[0]}
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoding", default="o200k_base", help="tiktoken encoding (o200k_base for gpt-4o/gpt-4o-mini)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    count, tokenizer = get_counter(args.encoding)
+    report = {}
+    for style in ("verbose", "compact"):
+        for agent, prompt in render_prompts(style).items():
+            report.setdefault(agent, {})[style] = {
+                "tokens": count(prompt["full"]),
+                "static_prefix_tokens": count(prompt["static_prefix"]),
+            }
+
+    if args.json:
+        print(json.dumps({"tokenizer": tokenizer, "agents": report}, indent=2))
+        return
+
+    print(f"tokenizer: {tokenizer}")
+    print(f"{'agent':<20}{'verbose':>10}{'compact':>10}{'saved':>8}{'prefix before':>16}{'prefix after':>14}")
+    totals = {"verbose": 0, "compact": 0}
+    for agent, styles in report.items():
+        verbose, compact = styles["verbose"], styles["compact"]
+        totals["verbose"] += verbose["tokens"]
+        totals["compact"] += compact["tokens"]
+        saved = 1 - compact["tokens"] / verbose["tokens"]
+        print(
+            f"{agent:<20}{verbose['tokens']:>10}{compact['tokens']:>10}{saved:>8.0%}"
+            f"{verbose['static_prefix_tokens']:>16}{compact['static_prefix_tokens']:>14}"
+        )
+
+    # One run = strategist + one creator call per angle + optimizer
+    print(f"{'per call total':<20}{totals['verbose']:>10}{totals['compact']:>10}{1 - totals['compact'] / totals['verbose']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
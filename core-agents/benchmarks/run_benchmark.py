@@ -0,0 +1,253 @@
+"""
+Latency/throughput benchmark for the orchestration layer.
+
+Drives /supervisor-agent/, /supervisor-agent/stream or the compiled graph
+in-process at increasing concurrency, and reports throughput, p50/p95/p99,
+time to first SSE event and memory per request. Pair it with
+benchmarks.fake_llm_server so the numbers only reflect this service.
+
+    # against a running server (pass its pid to also sample its RSS)
+    python -m benchmarks.run_benchmark --target blocking --target stream --server-pid 1234
+    
+    # the graph in-process, pointed at the fake LLM server
+    python -m benchmarks.run_benchmark --target graph --llm-base-url http://localhost:9000/v1
+    
+    # full vs express pipeline mode, side by side
+    python -m benchmarks.run_benchmark --mode full --mode express
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, Linux only."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class Result:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_event: List[float] = []
+        self.errors = 0
+
+
+def make_topic(args, index: int) -> str:
+    # Unique topics by default so the result/stage caches do not hide the pipeline
+    if args.repeat_topic:
+        return args.topic
+    return f"{args.topic} #{index} {uuid.uuid4().hex[:8]}"
+
+
+async def call_blocking(client: httpx.AsyncClient, args, topic: str, result: Result):
+    start = time.perf_counter()
+    response = await client.post(
+        "/supervisor-agent/",
+        json={"topic_context": topic, "mode": args.current_mode, **args.extra_body}
+    )
+    if response.status_code != 200:
+        result.errors += 1
+        return
+    result.latencies.append(time.perf_counter() - start)
+
+
+async def call_stream(client: httpx.AsyncClient, args, topic: str, result: Result):
+    start = time.perf_counter()
+    first_event = None
+    failed = False
+    
+    async with client.stream(
+        "POST",
+        "/supervisor-agent/stream",
+        json={"topic_context": topic, "incremental": args.incremental, "mode": args.current_mode, **args.extra_body}
+    ) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            # workflow_started is emitted before any work, measure the first real event
+            if first_event is None and event["event"] != "workflow_started":
+                first_event = time.perf_counter() - start
+            if event["event"] == "error":
+                failed = True
+    
+    if failed or response.status_code != 200:
+        result.errors += 1
+        return
+    result.latencies.append(time.perf_counter() - start)
+    if first_event is not None:
+        result.first_event.append(first_event)
+
+
+async def call_graph(pipeline, args, topic: str, result: Result):
+    start = time.perf_counter()
+    try:
+        await pipeline.graph_for(args.current_mode).ainvoke({"keys": {"topic_context": topic}})
+    except Exception as e:
+        print(f"graph error: {e}")
+        result.errors += 1
+        return
+    result.latencies.append(time.perf_counter() - start)
+
+
+async def run_level(target: str, concurrency: int, args, client=None, pipeline=None) -> Dict[str, Any]:
+    result = Result()
+    total = max(args.requests_per_level, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    counter = iter(range(total))
+    
+    async def one(index):
+        async with semaphore:
+            topic = make_topic(args, index)
+            if target == "blocking":
+                await call_blocking(client, args, topic, result)
+            elif target == "stream":
+                await call_stream(client, args, topic, result)
+            else:
+                await call_graph(pipeline, args, topic, result)
+    
+    rss_before = rss_bytes(args.server_pid) if args.server_pid else None
+    trace_memory = target == "graph" and args.trace_memory
+    if trace_memory:
+        tracemalloc.start()
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in counter))
+    elapsed = time.perf_counter() - start
+    
+    memory = {}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {
+            "peak_kib_per_inflight_request": round(peak / concurrency / 1024, 1),
+            "retained_kib_per_request": round(current / total / 1024, 1),
+        }
+    elif rss_before is not None:
+        rss_after = rss_bytes(args.server_pid)
+        memory = {"server_rss_delta_kib_per_request": round((rss_after - rss_before) / total / 1024, 1)}
+    
+    report = {
+        "target": target,
+        "mode": args.current_mode,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": result.errors,
+        "throughput_rps": round(len(result.latencies) / elapsed, 2),
+        "p50_s": round(percentile(result.latencies, 50), 3),
+        "p95_s": round(percentile(result.latencies, 95), 3),
+        "p99_s": round(percentile(result.latencies, 99), 3),
+        **memory,
+    }
+    if result.first_event:
+        report["first_event_p50_s"] = round(percentile(result.first_event, 50), 3)
+        report["first_event_p95_s"] = round(percentile(result.first_event, 95), 3)
+    return report
+
+
+def load_pipeline(args):
+    if args.llm_base_url:
+        os.environ["OPENAI_API_BASE"] = args.llm_base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    
+    from src.controller.agents.pipeline import init_pipeline
+    return init_pipeline()
+
+
+def print_report(report: Dict[str, Any]):
+    print("  ".join(f"{key}={value}" for key, value in report.items()))
+
+
+def print_mode_comparison(reports: List[Dict[str, Any]]):
+    """Express vs full p50/p95 and throughput at each target and concurrency."""
+    by_level = {}
+    for report in reports:
+        by_level.setdefault((report["target"], report["concurrency"]), {})[report["mode"]] = report
+    
+    print("express vs full:")
+    for (target, concurrency), modes in by_level.items():
+        full, express = modes.get("full"), modes.get("express")
+        if not full or not express or not full["p50_s"] or not full["throughput_rps"]:
+            continue
+        print(
+            f"  target={target}  concurrency={concurrency}"
+            f"  p50={express['p50_s'] / full['p50_s']:.2f}x"
+            f"  p95={express['p95_s'] / full['p95_s']:.2f}x"
+            f"  throughput={express['throughput_rps'] / full['throughput_rps']:.2f}x"
+        )
+
+
+async def main_async(args):
+    levels = [int(level) for level in args.concurrency.split(",")]
+    targets = args.target or ["blocking", "stream"]
+    reports = []
+    
+    pipeline = load_pipeline(args) if "graph" in targets else None
+    limits = httpx.Limits(max_connections=max(levels) * 2)
+    
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for target in targets:
+            for mode in args.mode:
+                args.current_mode = mode
+                for concurrency in levels:
+                    report = await run_level(target, concurrency, args, client=client, pipeline=pipeline)
+                    print_report(report)
+                    reports.append(report)
+    
+    if len(args.mode) > 1:
+        print_mode_comparison(reports)
+    
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(reports, output, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the supervisor agent service")
+    parser.add_argument("--target", action="append", choices=["blocking", "stream", "graph"],
+                        help="What to drive, repeatable (default: blocking and stream)")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Service URL for blocking/stream")
+    parser.add_argument("--llm-base-url", default=None, help="OpenAI-compatible URL for the in-process graph")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma separated concurrency levels")
+    parser.add_argument("--requests-per-level", type=int, default=64)
+    parser.add_argument("--topic", default="AI automation for small businesses")
+    parser.add_argument("--repeat-topic", action="store_true", help="Reuse one topic to measure the cache paths")
+    parser.add_argument("--incremental", action="store_true", help="Request agent_delta events on the stream target")
+    parser.add_argument("--mode", action="append", choices=["full", "express"],
+                        help="Pipeline mode, repeatable to compare them (default: full)")
+    parser.add_argument("--extra-body", type=json.loads, default={}, help="JSON merged into every request body")
+    parser.add_argument("--server-pid", type=int, default=None, help="Sample this process' RSS around each level")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="tracemalloc the graph target (slows it down, keep it off for latency numbers)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="Also write the reports as JSON")
+    args = parser.parse_args()
+    args.mode = args.mode or ["full"]
+    
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.controller.services.metrics import (
+    LLM_COMPLETION_TOKENS,
+    LLM_ERRORS,
+    LLM_LATENCY,
+    LLM_PROMPT_TOKENS,
+    LLM_TTFT,
+)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Process-wide handler attached to the compiled graph. Tracks each LLM run by
+    run_id, so one instance is safe to share between concurrent requests.
+    """
+    
+    run_inline = True
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, invocation_params=None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        invocation_params = invocation_params or {}
+        model = (
+            metadata.get("ls_model_name")
+            or invocation_params.get("model")
+            or invocation_params.get("model_name")
+            or "unknown"
+        )
+        with self._lock:
+            self._runs[run_id] = {
+                "start": time.perf_counter(),
+                "first_token": None,
+                "model": model,
+                "node": metadata.get("langgraph_node", "unknown"),
+            }
+    
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["first_token"] is None:
+                run["first_token"] = time.perf_counter()
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        
+        end = time.perf_counter()
+        labels = (run["model"], run["node"])
+        LLM_LATENCY.labels(*labels).observe(end - run["start"])
+        LLM_TTFT.labels(*labels).observe((run["first_token"] or end) - run["start"])
+        
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_PROMPT_TOKENS.labels(*labels).observe(usage.get("input_tokens", 0))
+                    LLM_COMPLETION_TOKENS.labels(*labels).observe(usage.get("output_tokens", 0))
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            LLM_ERRORS.labels(run["model"], run["node"]).inc()
+
+
+metrics_callback_handler = MetricsCallbackHandler()
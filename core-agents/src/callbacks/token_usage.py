@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, patch_config
+
+# Custom event HedgedChatModel dispatches with the candidate that answered
+MODEL_ANSWERED_EVENT = "llm_model_answered"
+
+
+class TokenUsageCallbackHandler(BaseCallbackHandler):
+    """
+    Counts the tokens of the LLM calls made under a single run, and keeps
+    the model that answered (after any fallback or hedge) in `model`.
+    
+    Unlike get_openai_callback, a new handler is attached to every node call,
+    so concurrent requests never share counters.
+    """
+    
+    run_inline = True
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.successful_requests = 0
+        self.model: Optional[str] = None
+    
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if name == MODEL_ANSWERED_EVENT:
+            self.model = data["model"]
+    
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        prompt_tokens = 0
+        completion_tokens = 0
+        found = False
+        
+        # Chat models report usage on the message (also when streaming with stream_usage)
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    found = True
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+        
+        # Fallback for providers that only fill llm_output
+        if not found and response.llm_output:
+            usage = response.llm_output.get("token_usage") or response.llm_output.get("usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0))
+            completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0))
+        
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.total_tokens += prompt_tokens + completion_tokens
+            self.successful_requests += 1
+
+
+def attach_token_usage(config: Optional[RunnableConfig]) -> Tuple[RunnableConfig, TokenUsageCallbackHandler]:
+    """
+    Return a copy of config with a fresh TokenUsageCallbackHandler added to
+    the callbacks inherited from the graph, plus the handler itself.
+    """
+    handler = TokenUsageCallbackHandler()
+    config = ensure_config(config)
+    callbacks = config.get("callbacks")
+    
+    if callbacks is None:
+        callbacks = [handler]
+    elif isinstance(callbacks, list):
+        callbacks = callbacks + [handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    
+    return patch_config(config, callbacks=callbacks), handler
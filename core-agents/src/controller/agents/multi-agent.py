@@ -1,27 +1,76 @@
-from typing import Annotated
+import functools
+import json
+from typing import Annotated, List
 
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.tools import tool
-from langchain_experimental.utilities import PythonREPL
+from langchain_core.tools import StructuredTool
 
-tavily_tool = TavilySearchResults(max_results=5)
+from src.controller.tools.python_sandbox import get_python_sandbox
+from src.controller.tools.web_search import get_web_search
 
-# This executes code locally, which can be unsafe
-repl = PythonREPL()
 
+def _format_search_results(results) -> str:
+    return json.dumps(results, ensure_ascii=False, indent=1)
 
-@tool
-def python_repl_tool(
+
+def _search(
+    queries: Annotated[List[str], "One or more search queries; several are searched in parallel."],
+):
+    return _format_search_results(get_web_search().search_many_sync(queries))
+
+
+async def _asearch(
+    queries: Annotated[List[str], "One or more search queries; several are searched in parallel."],
+):
+    return _format_search_results(await get_web_search().search_many(queries))
+
+
+# Cached by normalized query, deduplicated while in flight and fanned out in
+# parallel; the backend (Tavily by default) is picked by WEB_SEARCH_BACKEND
+web_search_tool = StructuredTool.from_function(
+    func=_search,
+    coroutine=_asearch,
+    name="web_search",
+    description=(
+        "Search the web for current information. Pass every query you need at once;"
+        " returns the top results (url and content) for each query."
+    ),
+)
+
+
+def _format_sandbox_result(code: str, result) -> str:
+    if result.status != "ok":
+        return f"Failed to execute. Error: {result.error}\nStdout: {result.output}"
+    truncated = "\n[output truncated]" if result.truncated else ""
+    return f"Successfully executed:\n```python\n{code}\n```\nStdout: {result.output}{truncated}"
+
+
+def _run_python(
+    code: Annotated[str, "The python code to execute to generate your chart."],
+):
+    return _format_sandbox_result(code, get_python_sandbox().run_sync(code))
+
+
+async def _arun_python(
     code: Annotated[str, "The python code to execute to generate your chart."],
 ):
-    """Use this to execute python code and do math. If you want to see the output of a value,
-    you should print it out with `print(...)`. This is visible to the user."""
-    try:
-        result = repl.run(code)
-    except BaseException as e:
-        return f"Failed to execute. Error: {repr(e)}"
-    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
-    return result_str
+    return _format_sandbox_result(code, await get_python_sandbox().run(code))
+
+
+# Runs on the sandbox worker pool (CPU, memory and wall-clock limits) instead
+# of in the server process; the async variant does not block the event loop.
+# Unlike PythonREPL, no state survives between calls: any worker of the pool
+# may take the next snippet, so the description tells the model so.
+python_repl_tool = StructuredTool.from_function(
+    func=_run_python,
+    coroutine=_arun_python,
+    name="python_repl_tool",
+    description=(
+        "Use this to execute python code and do math. If you want to see the output of a value,"
+        " you should print it out with `print(...)`. This is visible to the user."
+        " Every call runs in a fresh interpreter: variables, functions and imports from previous"
+        " calls are not kept, so each call must contain all the code it needs."
+    ),
+)
 
 
 # Create Agent Supervisor 
@@ -29,10 +78,13 @@ def python_repl_tool(
 from typing import Literal
 from typing_extensions import TypedDict
 
-from langchain_anthropic import ChatAnthropic
 from langgraph.graph import MessagesState, END
 from langgraph.types import Command
 
+from src.controller.constants.ai_models import AnthropicModel
+from src.controller.clients.llm_clients import get_chat_model
+from src.controller.agents.supervisor_router import RoutingEngine
+
 
 members = ["researcher", "coder"]
 # Our team supervisor is an LLM node. It just picks the next agent to process
@@ -54,20 +106,27 @@ class Router(TypedDict):
     next: Literal[*options]
 
 
-llm = ChatAnthropic(model="claude-3-5-sonnet-latest")
-
+@functools.lru_cache(maxsize=None)
+def get_supervisor_llm():
+    return get_chat_model(AnthropicModel.CLAUDE_3_5_SONNET_LATEST)
 
 
-def supervisor_node(state: MessagesState) -> Command[Literal[*members, "__end__"]]:
+def _llm_route(messages) -> str:
     messages = [
         {"role": "system", "content": system_prompt},
-    ] + state["messages"]
-    response = llm.with_structured_output(Router).invoke(messages)
-    goto = response["next"]
-    if goto == "FINISH":
-        goto = END
+    ] + list(messages)
+    response = get_supervisor_llm().with_structured_output(Router).invoke(messages)
+    return response["next"]
 
-    return Command(goto=goto)
+
+# Rules and a keyword classifier settle the obvious hops (the next worker the
+# request needs, FINISH once they replied); the LLM only routes the rest
+router = RoutingEngine(members, llm_route=_llm_route)
 
 
+def supervisor_node(state: MessagesState) -> Command[Literal[*members, "__end__"]]:
+    goto = router.route(state["messages"]).next
+    if goto == "FINISH":
+        goto = END
 
+    return Command(goto=goto)
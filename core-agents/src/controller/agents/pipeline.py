@@ -0,0 +1,213 @@
+from typing import TypedDict, Dict, Any, List, Optional, Annotated
+import functools
+import operator
+import threading
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, StateGraph, START
+
+from src.controller.constants.ai_models import OpenAIModel
+from src.model.agents import WeeklyContentStrategy, WeeklyTweetsPlan, OptimizedWeeklyContent, SimpleTweet
+from src.controller.services.model_router import build_agent_model
+from src.controller.cache.stage_cache import StageMemo, get_stage_cache
+from src.callbacks.metrics import metrics_callback_handler
+from src.controller.promtps.prompt_format import prompt_style, structured_output_mode
+from src.controller.promtps import (
+    content_strategist_prompt,
+    tweet_creator_prompt,
+    quality_optimizer_prompt,
+    express_prompt
+)
+from src.controller.chains.structured_output import bind_structured_output
+from src.controller.chains.content_strategist_chain import (
+    build_content_strategist_chain,
+    make_content_strategist_agent
+)
+from src.controller.chains.tweet_creator_chain import (
+    build_tweet_creator_chain,
+    make_tweet_creator_agent,
+    fan_out_angles,
+    merge_tweets,
+    amerge_tweets
+)
+from src.controller.chains.quality_optimizer_chain import (
+    build_quality_optimizer_chain,
+    make_quality_optimizer_agent
+)
+from src.controller.chains.express_chain import build_express_chain, make_express_agent
+from src.controller.chains.tweet_regenerator_chain import build_tweet_regenerator_chain
+from src.controller.chains.tweet_validator import (
+    ValidatorSettings,
+    make_tweet_validator,
+    route_after_validation
+)
+
+
+class AgentState(TypedDict):
+    keys: Dict[str, Any]
+    # Written concurrently by the per-angle tweet_creator branches
+    angle_tweets: Annotated[List[Dict[str, Any]], operator.add]
+
+
+# Agent mapping for frontend synchronization
+AGENT_INFO = {
+    "content_strategist": {"agent": "strategist", "name": "Content Strategist"},
+    "tweet_creator": {"agent": "creator", "name": "Tweet Creator"},
+    "quality_optimizer": {"agent": "optimizer", "name": "Quality Optimizer"},
+    # Express mode only
+    "express": {"agent": "express", "name": "Express Agent"}
+}
+
+# Output model of each agent, sent to the provider as its structured output schema
+AGENT_SCHEMAS = {
+    "content_strategist": WeeklyContentStrategy,
+    "tweet_creator": WeeklyTweetsPlan,
+    "quality_optimizer": OptimizedWeeklyContent,
+    "express": OptimizedWeeklyContent,
+    # Not a graph node: rewrites one tweet of a stored result
+    "tweet_regenerator": SimpleTweet
+}
+
+# full: Strategist -> Creator -> Optimizer, express: one merged LLM call
+PIPELINE_MODES = ("full", "express")
+
+
+def build_supervisor_graph(chains: Dict[str, Any], memo: StageMemo, validator: ValidatorSettings):
+    """
+    Build and compile the Strategist -> Creator -> Optimizer graph.
+    
+    The Tweet Creator runs as one parallel branch per content angle and
+    merge_tweets joins the branches. The local tweet validator then either
+    finishes the run or sends the failing tweets to the Quality Optimizer.
+    
+    Args:
+        chains: Runnable chain for each node, keyed by node name
+        memo: Stage memoization shared by the nodes
+        validator: Local validator settings; disabled, every run goes through the optimizer
+        
+    Returns:
+        The compiled LangGraph graph
+    """
+    graph_builder = StateGraph(AgentState)
+    
+    # Add nodes for each agent
+    graph_builder.add_node("content_strategist", make_content_strategist_agent(chains["content_strategist"], memo))
+    graph_builder.add_node("tweet_creator", make_tweet_creator_agent(chains["tweet_creator"], memo))
+    graph_builder.add_node("merge_tweets", RunnableLambda(merge_tweets, afunc=amerge_tweets, name="merge_tweets"))
+    graph_builder.add_node("quality_optimizer", make_quality_optimizer_agent(chains["quality_optimizer"], memo))
+    
+    # Define the flow: Strategist -> Creator (per angle) -> Merge -> [Validator ->] Optimizer -> END
+    graph_builder.add_edge(START, "content_strategist")
+    graph_builder.add_conditional_edges("content_strategist", fan_out_angles, ["tweet_creator"])
+    graph_builder.add_edge("tweet_creator", "merge_tweets")
+    if validator.enabled:
+        graph_builder.add_node("tweet_validator", make_tweet_validator(memo, validator))
+        graph_builder.add_edge("merge_tweets", "tweet_validator")
+        graph_builder.add_conditional_edges("tweet_validator", route_after_validation, ["quality_optimizer", END])
+    else:
+        graph_builder.add_edge("merge_tweets", "quality_optimizer")
+    graph_builder.add_edge("quality_optimizer", END)
+    
+    return graph_builder.compile()
+
+
+def build_express_graph(chains: Dict[str, Any], memo: StageMemo):
+    """Build and compile the express graph: one node, one structured LLM call."""
+    graph_builder = StateGraph(AgentState)
+    
+    graph_builder.add_node("express", make_express_agent(chains["express"], memo))
+    graph_builder.add_edge(START, "express")
+    graph_builder.add_edge("express", END)
+    
+    return graph_builder.compile()
+
+
+class AgentPipeline:
+    """
+    Everything the supervisor agent needs to serve a request: the routed model
+    of each agent, the prompt | llm | parser chains and the compiled graph of
+    each mode (`graph` is the full one).
+    
+    Built once at startup and shared by the blocking and streaming entry points.
+    """
+    
+    def __init__(self):
+        self.model = OpenAIModel.GPT_4_OMNI_MINI
+        # Primary/fallback per agent, overridable with <AGENT>_MODEL and <AGENT>_FALLBACK_MODEL
+        self.llms = {
+            node: build_agent_model(
+                node,
+                self.model,
+                bind=functools.partial(bind_structured_output, schema=AGENT_SCHEMAS[node]),
+                temperature=0,
+                streaming=False,
+                # Report token usage on streamed responses too (incremental SSE mode)
+                stream_usage=True
+            )
+            for node in AGENT_SCHEMAS
+        }
+        
+        self.chains = {
+            "content_strategist": build_content_strategist_chain(self.llms["content_strategist"]),
+            "tweet_creator": build_tweet_creator_chain(self.llms["tweet_creator"]),
+            "quality_optimizer": build_quality_optimizer_chain(self.llms["quality_optimizer"]),
+            "express": build_express_chain(self.llms["express"]),
+            "tweet_regenerator": build_tweet_regenerator_chain(self.llms["tweet_regenerator"])
+        }
+        
+        self.validator = ValidatorSettings.from_env()
+        
+        # Anything that changes the output for a given topic, used in cache keys
+        # (the regenerator only runs on request, it does not change a topic's output)
+        self.version = {
+            "models": {node: self.llms[node].model_names for node in AGENT_INFO},
+            "prompt_style": prompt_style(),
+            "structured_output": structured_output_mode(),
+            "validator": self.validator.version(),
+            "prompts": {
+                "content_strategist": content_strategist_prompt.PROMPT_VERSION,
+                "tweet_creator": tweet_creator_prompt.PROMPT_VERSION,
+                "quality_optimizer": quality_optimizer_prompt.PROMPT_VERSION,
+                "express": express_prompt.PROMPT_VERSION
+            }
+        }
+        
+        self.memo = StageMemo(get_stage_cache(), self.version)
+        graphs = {
+            "full": build_supervisor_graph(self.chains, self.memo, self.validator),
+            "express": build_express_graph(self.chains, self.memo)
+        }
+        # LLM latency/token metrics for every call made by the graphs
+        self.graphs = {
+            mode: graph.with_config(callbacks=[metrics_callback_handler])
+            for mode, graph in graphs.items()
+        }
+        self.graph = self.graphs["full"]
+    
+    def graph_for(self, mode: str = "full"):
+        if mode not in self.graphs:
+            raise ValueError(f"Unknown pipeline mode: {mode}")
+        return self.graphs[mode]
+
+
+_pipeline: Optional[AgentPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def init_pipeline() -> AgentPipeline:
+    """
+    Build the shared pipeline once. Called by the startup warm-up (in a
+    thread); a request arriving meanwhile waits for that build.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = AgentPipeline()
+    return _pipeline
+
+
+def get_pipeline() -> AgentPipeline:
+    """Return the shared pipeline, building it on first use if startup did not."""
+    if _pipeline is None:
+        return init_pipeline()
+    return _pipeline
@@ -1,18 +1,92 @@
 
-from typing import TypedDict, Dict, Any, AsyncGenerator
-import json
+from contextlib import aclosing
+from typing import Dict, Any, AsyncGenerator, List, Optional
 
-from langgraph.graph import END, StateGraph, START
+from langchain_core.utils.json import parse_json_markdown
 
-from src.controller.chains.content_strategist_chain import content_strategist_agent
-from src.controller.chains.tweet_creator_chain import tweet_creator_agent
-from src.controller.chains.quality_optimizer_chain import quality_optimizer_agent
+from src.controller.agents.pipeline import AGENT_INFO, PIPELINE_MODES, get_pipeline
+from src.controller.cache.result_cache import get_result_cache, get_result_store, result_cache_key
+from src.controller.chains.tweet_regenerator_chain import aregenerate_tweet, patch_response
+from src.callbacks.metrics import metrics_callback_handler
+from src.controller.cache.semantic_cache import get_semantic_cache
+from src.controller.services.cancellation import track_run_cost
+from src.controller.services.rate_limiter import llm_priority_var
+from src.controller.services.single_flight import get_single_flight, get_stream_fanout
+from src.controller.services.structured_logging import get_logger
 
-class AgentState(TypedDict):
-    keys: Dict[str, Any]
+logger = get_logger(__name__)
 
 
-async def supervisor_agent(topic_context: str):
+class ResultNotFound(Exception):
+    """Raised by regenerate_tweet for an unknown or expired result_id."""
+    
+    def __init__(self, result_id: str):
+        super().__init__(f"Unknown or expired result_id {result_id}")
+        self.result_id = result_id
+
+
+class TweetIndexOutOfRange(Exception):
+    """Raised by regenerate_tweet for a tweet index outside the result's tweets."""
+    
+    def __init__(self, index: int, count: int):
+        super().__init__(f"tweet index {index} out of range (0-{count - 1})")
+        self.index = index
+
+
+async def _semantic_lookup(topic_context: str, pipeline, cache, mode: str):
+    """
+    After an exact cache miss, look for a near-duplicate topic that was already
+    answered. Returns (its cached response or None, the lookup or None).
+    
+    A strategy match is only kept in full mode, the one with a strategist,
+    and is counted by the strategist once it knows whether it was reused.
+    """
+    semantic = get_semantic_cache(pipeline.version)
+    if semantic is None:
+        return None, None
+    
+    lookup = await semantic.lookup(topic_context)
+    if lookup is None:
+        return None, None
+    
+    response = None
+    if lookup.kind == "result" and cache is not None:
+        response = await cache.get(result_cache_key(lookup.topic, pipeline.version, mode))
+    if lookup.kind == "result" and response is None:
+        # The neighbour's response is gone: only its strategy can be reused
+        lookup.kind = "strategy"
+    if lookup.kind == "strategy" and mode != "full":
+        lookup.kind = None
+    
+    if lookup.kind != "strategy":
+        semantic.record(lookup.kind, lookup.topic)
+    return response, lookup
+
+
+def _graph_inputs(topic_context: str, lookup) -> Dict[str, Any]:
+    keys = {"topic_context": topic_context}
+    if lookup is not None and lookup.kind is not None:
+        # Close enough to reuse that topic's strategy even if its result is gone
+        keys["strategy_topic"] = lookup.topic
+    return {"keys": keys}
+
+
+async def _store_result(keys: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep a finished run under its result_id for regenerate_tweet; returns the response."""
+    response = keys["response"]
+    store = get_result_store()
+    if store is not None:
+        await store.set(response["result_id"], {**keys.get("result", {}), "response": response})
+    return response
+
+
+async def _remember_topic(topic_context: str, pipeline, lookup) -> None:
+    semantic = get_semantic_cache(pipeline.version)
+    if semantic is not None:
+        await semantic.add(topic_context, lookup)
+
+
+async def supervisor_agent(topic_context: str, mode: str = "full"):
     """
     Multi-agent system for generating weekly viral Twitter content.
     
@@ -21,54 +95,310 @@ async def supervisor_agent(topic_context: str):
     2. Tweet Creator: Generates tweets based on strategy
     3. Quality Optimizer: Refines and optimizes tweets
     
+    In express mode a single agent does all three in one LLM call.
+    
     Args:
         topic_context: The main topic or context for the weekly content
+        mode: "full" or "express"
         
     Returns:
         Dict with optimized weekly tweets and strategy notes
     """
     
-    # Build the graph with 3 agents
-    graph_builder = StateGraph(AgentState)
+    pipeline = get_pipeline()
+    graph = pipeline.graph_for(mode)
+    cache = get_result_cache()
+    cache_key = result_cache_key(topic_context, pipeline.version, mode)
     
-    # Add nodes for each agent
-    graph_builder.add_node("content_strategist", content_strategist_agent)
-    graph_builder.add_node("tweet_creator", tweet_creator_agent)
-    graph_builder.add_node("quality_optimizer", quality_optimizer_agent)
+    if cache is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info("result cache hit")
+            return cached
     
-    # Define the flow: Strategist -> Creator -> Optimizer -> END
-    graph_builder.add_edge(START, "content_strategist")
-    graph_builder.add_edge("content_strategist", "tweet_creator")
-    graph_builder.add_edge("tweet_creator", "quality_optimizer")
-    graph_builder.add_edge("quality_optimizer", END)
+    # Reworded topics we already answered
+    cached, lookup = await _semantic_lookup(topic_context, pipeline, cache, mode)
+    if cached is not None:
+        return cached
     
-    # Compile the graph
-    graph = graph_builder.compile()
+    async def run():
+        # Execute the workflow
+        with track_run_cost("blocking") as config:
+            final_state = await graph.ainvoke(_graph_inputs(topic_context, lookup), config)
+        
+        response = await _store_result(final_state["keys"])
+        
+        if cache is not None:
+            await cache.set(cache_key, response)
+        await _remember_topic(topic_context, pipeline, lookup)
+        
+        return response
     
-    # Execute the workflow
-    final_state = await graph.ainvoke({
+    # Identical requests already in flight share that run, which is cancelled
+    # if all of them disconnect
+    return await get_single_flight().do(cache_key, run)
+
+
+def supervisor_agent_sync(topic_context: str, mode: str = "full"):
+    """
+    Blocking version of supervisor_agent for scripts and workers without an
+    event loop. Runs the sync implementation of every node.
+    """
+    graph = get_pipeline().graph_for(mode)
+    
+    final_state = graph.invoke({
         "keys": {
             "topic_context": topic_context
         }
     })
     
-    response = final_state["keys"]["response"]
+    keys = final_state["keys"]
+    store = get_result_store()
+    if store is not None:
+        store.set_sync(keys["response"]["result_id"], {**keys.get("result", {}), "response": keys["response"]})
     
-    return response
+    return keys["response"]
+
+
+async def supervisor_agent_batch(
+    topics: List[str],
+    max_concurrency: int,
+    modes: Optional[List[str]] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run many topics through the compiled graph, at most max_concurrency at a time.
+    
+    Cached topics are answered first, the rest go through graph.abatch_as_completed
+    so each result is yielded as soon as its item finishes. `modes` gives the
+    pipeline mode of each topic (default full); each mode's items run as one
+    abatch_as_completed call, express first.
+    
+    Yields:
+        - {"index": int, "data": dict, "cached": bool} for a finished item
+        - {"index": int, "error": str} for a failed item (the batch keeps going)
+    """
+    pipeline = get_pipeline()
+    cache = get_result_cache()
+    modes = modes or ["full"] * len(topics)
+    cache_keys = [result_cache_key(topic, pipeline.version, mode) for topic, mode in zip(topics, modes)]
+    pending: Dict[str, List[int]] = {}
+    
+    for index, topic in enumerate(topics):
+        cached = await cache.get(cache_keys[index]) if cache is not None else None
+        if cached is not None:
+            yield {"index": index, "data": cached, "cached": True}
+        else:
+            pending.setdefault(modes[index], []).append(index)
+    
+    if not pending:
+        return
+    
+    # Queue behind interactive requests when the LLM budget is tight. The
+    # generator runs in its consumer's context: restore the priority after
+    token = llm_priority_var.set("batch")
+    try:
+        for mode in sorted(pending, key=PIPELINE_MODES.index, reverse=True):
+            indices = pending[mode]
+            inputs = [{"keys": {"topic_context": topics[index]}} for index in indices]
+            
+            async for position, result in pipeline.graph_for(mode).abatch_as_completed(
+                inputs,
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            ):
+                index = indices[position]
+                
+                if isinstance(result, Exception):
+                    logger.warning("batch item failed", extra={"index": index, "error": str(result)})
+                    yield {"index": index, "error": str(result)}
+                    continue
+                
+                response = await _store_result(result["keys"])
+                if cache is not None:
+                    await cache.set(cache_keys[index], response)
+                
+                yield {"index": index, "data": response, "cached": False}
+    finally:
+        try:
+            llm_priority_var.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. garbage collected): nothing leaked there
+            pass
+
+
+def _agent_event(event: str, node_name: str) -> Dict[str, Any]:
+    info = AGENT_INFO[node_name]
+    return {
+        "event": event,
+        "agent": info["agent"],
+        "name": info["name"]
+    }
+
+
+async def _stream_node_updates(graph, inputs, config) -> AsyncGenerator[Dict[str, Any], None]:
+    """Coarse mode: agent_started/agent_completed per node from graph.astream."""
+    current_node = None
+    final_state = None
+    final_node = None
+    
+    async for chunk in graph.astream(inputs, config):
+        # LangGraph streams chunks as {node_name: result}
+        node_name = list(chunk.keys())[0] if chunk else None
+        
+        if node_name and node_name in AGENT_INFO:
+            # If we're entering a new node, emit started event
+            if current_node != node_name:
+                if current_node:
+                    # Complete previous agent
+                    yield _agent_event("agent_completed", current_node)
+                
+                # Start new agent
+                yield _agent_event("agent_started", node_name)
+                current_node = node_name
+        
+        # Capture the final state from the stream
+        final_state = chunk
+        final_node = node_name
+    
+    # Complete the last agent
+    if current_node and current_node in AGENT_INFO:
+        yield _agent_event("agent_completed", current_node)
+    
+    # Extract response from the final streamed state
+    # The last chunk contains the final node's output (the optimizer, or the
+    # validator when it skipped the optimizer)
+    if final_state and final_node:
+        response = await _store_result(final_state[final_node]["keys"])
+    else:
+        raise Exception("No final state received from workflow")
+    
+    yield {
+        "event": "final_result",
+        "data": response
+    }
+
+
+def _written_tweets(tweets) -> List[Dict[str, Any]]:
+    return [tweet for tweet in tweets or [] if isinstance(tweet, dict) and isinstance(tweet.get("tweet_text"), str)]
+
+
+def _week_so_far(node_name: str, run_id: str, partial: Dict[str, Any], creator_runs: Dict[str, List], validated: Optional[Dict[str, Any]]):
+    """
+    The whole week's tweets as they stand after a delta, or None for agents
+    that do not write tweets. The creator's parallel branches are joined; the
+    optimizer, which only rewrites the tweets the validator failed, is patched
+    into the validated tweets at their positions.
+    """
+    if node_name == "tweet_creator":
+        creator_runs[run_id] = _written_tweets(partial.get("tweets"))
+        return [tweet for tweets in creator_runs.values() for tweet in tweets]
+    
+    if "weekly_tweets" not in partial:
+        return None
+    tweets = _written_tweets(partial["weekly_tweets"])
+    if node_name == "quality_optimizer" and validated and validated.get("validation"):
+        week = list(validated["generated_tweets"]["tweets"])
+        for index, tweet in zip(validated["validation"]["failing"], tweets):
+            week[index] = tweet
+        return week
+    return tweets
 
 
-async def supervisor_agent_stream(topic_context: str) -> AsyncGenerator[Dict[str, Any], None]:
+async def _stream_token_deltas(graph, inputs, config) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Incremental mode: on top of the agent events, forward every LLM token as an
+    agent_delta event together with the agent's JSON output parsed so far and,
+    for the creator and optimizer, the whole week's tweets so far ("tweets").
+    """
+    running: Dict[str, int] = {}
+    # Keyed by LLM run so parallel tweet_creator branches do not interleave
+    buffers: Dict[str, str] = {}
+    last_partial: Dict[str, Any] = {}
+    creator_runs: Dict[str, List] = {}
+    validated = None
+    response = None
+    
+    async for event in graph.astream_events(inputs, config, version="v2"):
+        kind = event["event"]
+        name = event["name"]
+        node_name = event.get("metadata", {}).get("langgraph_node")
+        
+        if kind == "on_chain_start" and name in AGENT_INFO:
+            if name not in running:
+                yield _agent_event("agent_started", name)
+            running[name] = running.get(name, 0) + 1
+        
+        elif kind == "on_chat_model_stream" and node_name in AGENT_INFO:
+            token = event["data"]["chunk"].content
+            if not token:
+                continue
+            
+            run_id = event["run_id"]
+            buffers[run_id] = buffers.get(run_id, "") + token
+            delta = _agent_event("agent_delta", node_name)
+            delta["token"] = token
+            
+            # Attach the partial JSON only when it changed since the last delta
+            try:
+                partial = parse_json_markdown(buffers[run_id])
+            except Exception:
+                partial = None
+            if partial and partial != last_partial.get(run_id):
+                last_partial[run_id] = partial
+                delta["partial"] = partial
+                if isinstance(partial, dict):
+                    week = _week_so_far(node_name, run_id, partial, creator_runs, validated)
+                    if week is not None:
+                        delta["tweets"] = week
+            
+            yield delta
+        
+        elif kind == "on_chain_end" and name == "tweet_validator":
+            # Tweets and failing positions the optimizer's deltas patch into
+            validated = event["data"]["output"]["keys"]
+        
+        elif kind == "on_chain_end" and name in AGENT_INFO:
+            # An agent is done once all of its (parallel) runs have ended
+            running[name] -= 1
+            if running[name] == 0:
+                yield _agent_event("agent_completed", name)
+        
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            # End of the root graph run carries the final state
+            response = await _store_result(event["data"]["output"]["keys"])
+    
+    if response is None:
+        raise Exception("No final state received from workflow")
+    
+    yield {
+        "event": "final_result",
+        "data": response
+    }
+
+
+async def supervisor_agent_stream(
+    topic_context: str,
+    incremental: bool = False,
+    mode: str = "full"
+) -> AsyncGenerator[Dict[str, Any], None]:
     """
     Streaming version of supervisor agent that emits events during execution.
     
     This allows the frontend to synchronize animations with the actual agent execution.
     
+    Args:
+        topic_context: The main topic or context for the weekly content
+        incremental: Also stream LLM tokens and partially parsed output
+        mode: "full" or "express" (a single express agent)
+        
     Yields:
         Events with structure:
         - {"event": "workflow_started", "topic": str}
         - {"event": "agent_started", "agent": str, "name": str}
+        - {"event": "agent_delta", "agent": str, "name": str, "token": str, "partial": dict}
+          (incremental mode only, "partial" is omitted while it is unchanged)
         - {"event": "agent_completed", "agent": str, "name": str}
-        - {"event": "final_result", "data": dict}
+        - {"event": "final_result", "data": dict, "cached": bool}
         - {"event": "error", "message": str}
     """
     try:
@@ -78,92 +408,112 @@ async def supervisor_agent_stream(topic_context: str) -> AsyncGenerator[Dict[str
             "topic": topic_context
         }
         
-        # Build the graph with 3 agents
-        graph_builder = StateGraph(AgentState)
+        pipeline = get_pipeline()
+        graph = pipeline.graph_for(mode)
+        cache = get_result_cache()
+        cache_key = result_cache_key(topic_context, pipeline.version, mode)
         
-        # Agent mapping for frontend synchronization
-        agent_info = {
-            "content_strategist": {"agent": "strategist", "name": "Content Strategist"},
-            "tweet_creator": {"agent": "creator", "name": "Tweet Creator"},
-            "quality_optimizer": {"agent": "optimizer", "name": "Quality Optimizer"}
-        }
+        # On a cache hit skip the agents and return the result right away
+        if cache is not None:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info("result cache hit")
+                yield {
+                    "event": "final_result",
+                    "data": cached,
+                    "cached": True
+                }
+                return
         
-        # Add nodes for each agent
-        graph_builder.add_node("content_strategist", content_strategist_agent)
-        graph_builder.add_node("tweet_creator", tweet_creator_agent)
-        graph_builder.add_node("quality_optimizer", quality_optimizer_agent)
-        
-        # Define the flow: Strategist -> Creator -> Optimizer -> END
-        graph_builder.add_edge(START, "content_strategist")
-        graph_builder.add_edge("content_strategist", "tweet_creator")
-        graph_builder.add_edge("tweet_creator", "quality_optimizer")
-        graph_builder.add_edge("quality_optimizer", END)
-        
-        # Compile the graph
-        graph = graph_builder.compile()
-        
-        # Execute the workflow with streaming (only once!)
-        current_node = None
-        final_state = None
-        
-        async for chunk in graph.astream({
-            "keys": {
-                "topic_context": topic_context
-            }
-        }):
-            # LangGraph streams chunks as {node_name: result}
-            node_name = list(chunk.keys())[0] if chunk else None
-            
-            if node_name and node_name in agent_info:
-                # If we're entering a new node, emit started event
-                if current_node != node_name:
-                    if current_node:
-                        # Complete previous agent
-                        info = agent_info[current_node]
-                        yield {
-                            "event": "agent_completed",
-                            "agent": info["agent"],
-                            "name": info["name"]
-                        }
-                    
-                    # Start new agent
-                    info = agent_info[node_name]
-                    yield {
-                        "event": "agent_started",
-                        "agent": info["agent"],
-                        "name": info["name"]
-                    }
-                    current_node = node_name
-            
-            # Capture the final state from the stream
-            final_state = chunk
-        
-        # Complete the last agent
-        if current_node and current_node in agent_info:
-            info = agent_info[current_node]
+        # Reworded topics we already answered
+        cached, lookup = await _semantic_lookup(topic_context, pipeline, cache, mode)
+        if cached is not None:
             yield {
-                "event": "agent_completed",
-                "agent": info["agent"],
-                "name": info["name"]
+                "event": "final_result",
+                "data": cached,
+                "cached": True
             }
+            return
         
-        # Extract response from the final streamed state
-        # The last chunk contains the final node's output
-        if final_state and current_node:
-            response = final_state[current_node]["keys"]["response"]
-        else:
-            raise Exception("No final state received from workflow")
+        inputs = _graph_inputs(topic_context, lookup)
+        stream = _stream_token_deltas if incremental else _stream_node_updates
         
-        # Emit final result
-        yield {
-            "event": "final_result",
-            "data": response
-        }
+        async def produce():
+            # Execute the workflow with streaming (only once!)
+            with track_run_cost("stream") as config:
+                async with aclosing(stream(graph, inputs, config)) as events:
+                    async for event in events:
+                        if event["event"] == "final_result":
+                            if cache is not None:
+                                await cache.set(cache_key, event["data"])
+                            await _remember_topic(topic_context, pipeline, lookup)
+                            event["cached"] = False
+                        
+                        yield event
+        
+        # Identical streams already in flight fan the same events out to us;
+        # the run is cancelled once every subscriber disconnects
+        fanout_key = f"{cache_key}:{'incremental' if incremental else 'coarse'}"
+        async with aclosing(get_stream_fanout().subscribe(fanout_key, produce)) as events:
+            async for event in events:
+                yield event
         
     except Exception as e:
-        print(f"Error in supervisor_agent_stream: {e}")
+        logger.exception("supervisor_agent_stream failed")
         yield {
             "event": "error",
             "message": str(e)
         }
 
+
+async def regenerate_tweet(result_id: str, index: int, feedback: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replace one tweet of a stored result without re-running the pipeline.
+    
+    The stored strategy and the sibling tweets are the context of a single
+    creator+optimizer LLM call for that slot. The patched result is stored
+    under a new result_id, so edits can be chained.
+    
+    Args:
+        result_id: result_id of a previous response (or of a patched one)
+        index: Position of the tweet to replace in its "tweets"
+        feedback: Optional editor note on why the tweet was rejected
+        
+    Returns:
+        {"data": patched response, "tweet_index": int, "previous_tweet": dict,
+         "token_delta": {"tokens": int, "full_run_tokens": int}}
+        
+    Raises:
+        ResultNotFound: unknown or expired result_id
+        TweetIndexOutOfRange: index outside the result's tweets
+    """
+    store = get_result_store()
+    record = await store.get(result_id) if store is not None else None
+    if record is None:
+        raise ResultNotFound(result_id)
+    
+    response = record["response"]
+    if not 0 <= index < len(response["tweets"]):
+        raise TweetIndexOutOfRange(index, len(response["tweets"]))
+    
+    pipeline = get_pipeline()
+    with track_run_cost("regenerate") as config:
+        # Label the call's LLM metrics like the graph nodes' calls
+        config = {**config, "callbacks": [*config.get("callbacks", []), metrics_callback_handler],
+                  "metadata": {"langgraph_node": "tweet_regenerator"}}
+        tweet, tokens = await aregenerate_tweet(pipeline.chains["tweet_regenerator"], record, index, feedback, config)
+    
+    patched = patch_response(response, index, tweet, tokens)
+    await store.set(patched["result_id"], {**record, "response": patched})
+    
+    tokens_used = response["models"]["chat"]["tokens"]
+    return {
+        "data": patched,
+        "tweet_index": index,
+        "previous_tweet": response["tweets"][index],
+        "token_delta": {
+            "tokens": tokens,
+            # What the run that produced the tweets cost, for comparison
+            "full_run_tokens": tokens_used.get("total", 0) - tokens_used.get("regeneration", 0)
+        }
+    }
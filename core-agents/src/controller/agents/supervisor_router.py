@@ -0,0 +1,256 @@
+import os
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.controller.cache.result_cache import LRUCache, make_cache_key
+from src.controller.services.metrics import ROUTER_DECISIONS, ROUTER_LATENCY
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+FINISH = "FINISH"
+
+# Words in the user request that call for each worker. Only specific ones:
+# question words and common verbs ("who", "when", "run", "find") appear in
+# most requests and would route them without telling the workers apart.
+WORKER_KEYWORDS = {
+    "researcher": (
+        "search", "look up", "lookup", "research", "latest", "news",
+        "recent", "price", "gdp", "population",
+    ),
+    "coder": (
+        "code", "python", "chart", "plot", "graph", "draw", "visualize", "calculate",
+        "compute", "math", "average", "percentage",
+    ),
+}
+
+# Worker replies that did not get the job done
+FAILURE_MARKERS = ("failed to execute", "error:", "traceback", "i could not", "i couldn't", "unable to")
+
+# Every planned worker replied without a failure marker: FINISH does not
+# depend on how many keywords picked the workers
+FINISH_CONFIDENCE = 0.95
+
+
+@dataclass(frozen=True)
+class RouterSettings:
+    """Routing settings, from SUPERVISOR_ROUTER_* variables."""
+    
+    mode: str = "rules"
+    min_confidence: float = 0.75
+    cache_size: int = 1024
+    cache_ttl: float = 3600.0
+    
+    @classmethod
+    def from_env(cls) -> "RouterSettings":
+        """
+        SUPERVISOR_ROUTER_MODE is "rules" (rules and classifier, LLM unless
+        above SUPERVISOR_ROUTER_MIN_CONFIDENCE) or "llm" (every hop through the LLM).
+        """
+        return cls(
+            mode=os.getenv("SUPERVISOR_ROUTER_MODE", cls.mode),
+            min_confidence=float(os.getenv("SUPERVISOR_ROUTER_MIN_CONFIDENCE", cls.min_confidence)),
+            cache_size=int(os.getenv("SUPERVISOR_ROUTER_CACHE_SIZE", cls.cache_size)),
+            cache_ttl=float(os.getenv("SUPERVISOR_ROUTER_CACHE_TTL", cls.cache_ttl)),
+        )
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    next: str
+    confidence: float
+    source: str
+    reason: str = ""
+
+
+@dataclass(frozen=True)
+class Message:
+    role: str
+    name: Optional[str]
+    content: str
+
+
+def normalize_messages(messages: Sequence[Any]) -> List[Message]:
+    """LangChain messages or {"role", "content"} dicts as (role, name, content)."""
+    normalized = []
+    for message in messages:
+        if isinstance(message, dict):
+            role, name, content = message.get("role"), message.get("name"), message.get("content")
+        else:
+            role, name, content = message.type, getattr(message, "name", None), message.content
+        if not isinstance(content, str):
+            # Content blocks: keep the text parts
+            content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+        normalized.append(Message(role or "", name, content or ""))
+    return normalized
+
+
+def _matches(text: str, keyword: str) -> bool:
+    return re.search(rf"\b{re.escape(keyword)}\b", text) is not None
+
+
+class KeywordClassifier:
+    """
+    Local classifier for which workers a user request needs, from keyword
+    hits per worker. A worker is needed when it has hits; confidence grows
+    with the number of hits and is low when no worker matched.
+    """
+    
+    def __init__(self, keywords: Dict[str, Sequence[str]]):
+        self.keywords = keywords
+    
+    def needed_workers(self, request: str):
+        """(workers in the order they should run, confidence)"""
+        text = request.lower()
+        hits = {
+            worker: sum(_matches(text, keyword) for keyword in keywords)
+            for worker, keywords in self.keywords.items()
+        }
+        needed = [worker for worker in self.keywords if hits[worker] > 0]
+        if not needed:
+            return [], 0.0
+        confidence = round(min(0.95, 0.6 + 0.15 * min(hits[worker] for worker in needed)), 2)
+        return needed, confidence
+
+
+def _last_worker_reply(history: List[Message], members: Sequence[str]) -> Optional[Message]:
+    for message in reversed(history):
+        if message.name in members:
+            return message
+    return None
+
+
+def _is_failure(message: Message) -> bool:
+    content = message.content.lower()
+    return not content.strip() or any(marker in content for marker in FAILURE_MARKERS)
+
+
+class RoutingEngine:
+    """
+    Picks the next supervisor hop. Rules run first, in order; the first one
+    that returns a decision settles the hop when its confidence is above
+    min_confidence, otherwise (or when no rule matched) `llm_route`
+    decides. Decisions are cached by the hash of the message history, so a
+    replayed or retried state routes without rules or LLM.
+    
+    A rule is a callable (engine, history) -> Optional[RouteDecision]; pass
+    `rules` to replace the defaults.
+    """
+    
+    def __init__(
+        self,
+        members: Sequence[str],
+        llm_route: Callable[[Sequence[Any]], str],
+        rules: Optional[Sequence[Callable]] = None,
+        classifier: Optional[KeywordClassifier] = None,
+        settings: Optional[RouterSettings] = None,
+    ):
+        self.members = list(members)
+        self.llm_route = llm_route
+        self.rules = list(rules) if rules is not None else [rule_failed_worker, rule_request_plan]
+        self.classifier = classifier or KeywordClassifier(WORKER_KEYWORDS)
+        self.settings = settings or RouterSettings.from_env()
+        self._cache = LRUCache(self.settings.cache_size, self.settings.cache_ttl)
+        self._lock = threading.Lock()
+        self.stats = {"decisions": 0, "cache_hits": 0, "rules": 0, "llm": 0}
+        _engines.add(self)
+    
+    def state_key(self, history: List[Message]) -> str:
+        return make_cache_key("supervisor_route", self.members, [
+            (message.role, message.name, message.content) for message in history
+        ])
+    
+    def route(self, messages: Sequence[Any]) -> RouteDecision:
+        start = time.perf_counter()
+        history = normalize_messages(messages)
+        key = self.state_key(history)
+        
+        decision = self._cache.get(key)
+        if decision is not None:
+            decision = RouteDecision(decision.next, decision.confidence, "cache", decision.reason)
+        else:
+            decision = self._decide(messages, history)
+            self._cache.set(key, decision)
+        
+        ROUTER_DECISIONS.labels(decision.source, decision.next).inc()
+        ROUTER_LATENCY.labels(decision.source).observe(time.perf_counter() - start)
+        with self._lock:
+            self.stats["decisions"] += 1
+            self.stats["cache_hits" if decision.source == "cache" else decision.source] += 1
+        logger.info("supervisor routed", extra={
+            "next": decision.next,
+            "source": decision.source,
+            "confidence": decision.confidence,
+            "reason": decision.reason
+        })
+        return decision
+    
+    def _decide(self, messages: Sequence[Any], history: List[Message]) -> RouteDecision:
+        if self.settings.mode != "llm":
+            for rule in self.rules:
+                decision = rule(self, history)
+                if decision is None:
+                    continue
+                if decision.confidence > self.settings.min_confidence:
+                    return decision
+                # The first rule that matched is not sure: the LLM decides
+                break
+        
+        return RouteDecision(self.llm_route(messages), 1.0, "llm")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        routed = stats["rules"] + stats["llm"]
+        stats["llm_fallback_rate"] = round(stats["llm"] / routed, 3) if routed else 0.0
+        stats["cached_states"] = len(self._cache)
+        return stats
+
+
+_engines: "weakref.WeakSet[RoutingEngine]" = weakref.WeakSet()
+
+
+def get_router_stats() -> Dict[str, Any]:
+    """Stats of every live routing engine, keyed by its members; empty until one is built."""
+    return {"_".join(engine.members): engine.get_stats() for engine in list(_engines)}
+
+
+def rule_failed_worker(engine: RoutingEngine, history: List[Message]) -> Optional[RouteDecision]:
+    """A failed worker reply needs judgement (retry, other worker, give up): leave it to the LLM."""
+    last = history[-1] if history else None
+    if last is not None and last.name in engine.members and _is_failure(last):
+        return RouteDecision(FINISH, 0.0, "rules", f"{last.name} failed")
+    return None
+
+
+def rule_request_plan(engine: RoutingEngine, history: List[Message]) -> Optional[RouteDecision]:
+    """
+    Runs the workers the classifier says the user request needs, in order,
+    each until it replied successfully, then FINISH. The classifier's
+    confidence only covers which worker runs next.
+    """
+    request = next((
+        message for message in history
+        if message.role in ("human", "user") and message.name not in engine.members
+    ), None)
+    if request is None:
+        return None
+    
+    needed, confidence = engine.classifier.needed_workers(request.content)
+    if not needed:
+        return None
+    
+    done = {
+        message.name for message in history
+        if message.name in engine.members and not _is_failure(message)
+    }
+    pending = [worker for worker in needed if worker not in done]
+    if pending:
+        return RouteDecision(pending[0], confidence, "rules", f"request needs {pending[0]}")
+    
+    last = _last_worker_reply(history, engine.members)
+    return RouteDecision(FINISH, FINISH_CONFIDENCE, "rules", f"{last.name} replied successfully")
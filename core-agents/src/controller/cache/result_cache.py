@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def cache_dir() -> str:
+    path = os.getenv("CACHE_DIR", ".cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def normalize_topic(topic_context: str) -> str:
+    """Lowercase and collapse whitespace so trivially different topics share a key."""
+    return re.sub(r"\s+", " ", topic_context).strip().lower()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable sha256 key over JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-memory LRU cache with a per-entry TTL."""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Next time expired rows may be purged, per database file (shared by every
+# SQLiteCache of this process on that file)
+_next_purge: Dict[str, float] = {}
+_purge_lock = threading.Lock()
+
+
+class SQLiteCache:
+    """
+    On-disk JSON cache shared by every uvicorn worker on the host.
+    WAL mode lets workers read while another one writes.
+    
+    Expired rows of every namespace in the file are deleted on a write at
+    most once per CACHE_PURGE_INTERVAL_SECONDS (default 600) per process.
+    """
+    
+    def __init__(self, path: str, namespace: str, ttl: float):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.purge_interval = _env_int("CACHE_PURGE_INTERVAL_SECONDS", 600)
+        self._local = threading.local()
+        
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Any) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time() + self.ttl)
+            )
+        self._maybe_purge()
+    
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        with _purge_lock:
+            if now < _next_purge.get(self.path, 0):
+                return
+            _next_purge[self.path] = now + self.purge_interval
+        try:
+            self.purge_expired()
+        except sqlite3.Error:
+            # Another worker holds the write lock; the next interval retries
+            pass
+    
+    def purge_expired(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+
+class TwoTierCache:
+    """
+    Memory LRU in front of the shared SQLite tier. Disk hits are promoted
+    to memory. Disk access runs in a thread so it never blocks the event loop.
+    """
+    
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+        }
+    
+    def _get_memory(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+        return value
+    
+    def _record_disk(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        if value is not None:
+            self.stats["disk_hits"] += 1
+            self.memory.set(key, value)
+        else:
+            self.stats["misses"] += 1
+        return value
+    
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        
+        disk_value = None
+        if self.disk is not None:
+            disk_value = await asyncio.to_thread(self.disk.get, key)
+        return self._record_disk(key, disk_value)
+    
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+        self.stats["writes"] += 1
+    
+    def get_sync(self, key: str) -> Optional[Any]:
+        """Blocking variant of get for code running outside the event loop."""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        
+        disk_value = self.disk.get(key) if self.disk is not None else None
+        return self._record_disk(key, disk_value)
+    
+    def set_sync(self, key: str, value: Any) -> None:
+        """Blocking variant of set for code running outside the event loop."""
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self.stats["writes"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_size": len(self.memory),
+        }
+
+
+def build_two_tier_cache(namespace: str, prefix: str) -> TwoTierCache:
+    """
+    Build a TwoTierCache configured from <prefix>_MAX_SIZE, <prefix>_TTL_SECONDS
+    and <prefix>_DISK (set to 0 to keep it memory only).
+    """
+    ttl = _env_int(f"{prefix}_TTL_SECONDS", 24 * 60 * 60)
+    memory = LRUCache(_env_int(f"{prefix}_MAX_SIZE", 256), ttl)
+    
+    disk = None
+    if os.getenv(f"{prefix}_DISK", "1") != "0":
+        disk = SQLiteCache(os.path.join(cache_dir(), "cache.sqlite3"), namespace, ttl)
+    
+    return TwoTierCache(memory, disk)
+
+
+_result_cache: Optional[TwoTierCache] = None
+
+
+def get_result_cache() -> Optional[TwoTierCache]:
+    """Shared cache of final /supervisor-agent responses, None when RESULT_CACHE_ENABLED=0."""
+    global _result_cache
+    if os.getenv("RESULT_CACHE_ENABLED", "1") == "0":
+        return None
+    if _result_cache is None:
+        _result_cache = build_two_tier_cache("results", "RESULT_CACHE")
+    return _result_cache
+
+
+_result_store: Optional[TwoTierCache] = None
+
+
+def get_result_store() -> Optional[TwoTierCache]:
+    """
+    Finished runs by result_id (response, topic and strategy), for regenerating
+    a single tweet. Configured with RESULT_STORE_MAX_SIZE / _TTL_SECONDS / _DISK,
+    None when RESULT_STORE_ENABLED=0.
+    """
+    global _result_store
+    if os.getenv("RESULT_STORE_ENABLED", "1") == "0":
+        return None
+    if _result_store is None:
+        _result_store = build_two_tier_cache("result_store", "RESULT_STORE")
+    return _result_store
+
+
+def result_cache_key(topic_context: str, version: Dict[str, Any], mode: str = "full") -> str:
+    """Key on the normalized topic, the pipeline mode and the pipeline's model and prompt versions."""
+    return make_cache_key("result", normalize_topic(topic_context), mode, version)
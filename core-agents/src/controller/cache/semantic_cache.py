@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from prometheus_client import Histogram
+
+from .result_cache import cache_dir, make_cache_key, normalize_topic
+from ..clients.llm_clients import get_embedding_model
+from ..constants.ai_models import OpenAIModel
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+SEMANTIC_SIMILARITY = Histogram(
+    "semantic_cache_similarity",
+    "Cosine similarity of the nearest cached topic on each semantic cache lookup",
+    buckets=(0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0),
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class OpenAIEmbedder:
+    """text-embedding-3-small over the pooled OpenAI client."""
+    
+    name = OpenAIModel.EMBEDDING_3_SMALL.value
+    dim = 1536
+    # Paraphrases of a topic typically land above 0.9
+    result_threshold = 0.93
+    strategy_threshold = 0.85
+    
+    def __init__(self):
+        self.embeddings = get_embedding_model(OpenAIModel.EMBEDDING_3_SMALL)
+    
+    def embed(self, text: str) -> np.ndarray:
+        return _normalize(np.asarray(self.embeddings.embed_query(text), dtype=np.float32))
+    
+    async def aembed(self, text: str) -> np.ndarray:
+        return _normalize(np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32))
+
+
+class HashingEmbedder:
+    """
+    Offline embedder: words and character trigrams hashed into a fixed-size
+    signed vector. Catches reworded topics that share most of their words
+    ("automation"/"automating" share trigrams) without any network call.
+    """
+    
+    # Lexical similarity runs lower than embedding similarity for paraphrases
+    result_threshold = 0.85
+    strategy_threshold = 0.7
+    
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+    
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"^{word}$"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+    
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # Whole words weigh more than single trigrams
+            weight = 2.0 if feature.startswith("w:") else 1.0
+            vector[value % self.dim] += weight if (value >> 63) & 1 else -weight
+        return _normalize(vector)
+    
+    async def aembed(self, text: str) -> np.ndarray:
+        return self.embed(text)
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """
+    Brute-force cosine index: the vectors of a namespace live in one NumPy
+    matrix in memory and in the shared SQLite file on disk. Rows added by other
+    workers are picked up incrementally on the next search.
+    
+    Entries expire after `ttl` seconds, like the cached results they point
+    to, and only the newest `max_entries` are kept.
+    """
+    
+    def __init__(self, path: str, namespace: str, dim: int, ttl: float, max_entries: int):
+        self.path = path
+        self.namespace = namespace
+        self.dim = dim
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._topics: List[str] = []
+        self._created = np.zeros(0, dtype=np.float64)
+        self._last_id = 0
+        
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_index ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " namespace TEXT NOT NULL,"
+                " topic TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " UNIQUE (namespace, topic))"
+            )
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn = conn
+        return conn
+    
+    def _refresh(self) -> None:
+        cutoff = time.time() - self.ttl
+        rows = self._connection().execute(
+            "SELECT id, topic, vector, created_at FROM semantic_index"
+            " WHERE namespace = ? AND id > ? AND created_at >= ? ORDER BY id",
+            (self.namespace, self._last_id, cutoff)
+        ).fetchall()
+        if rows:
+            vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            self._vectors = np.vstack([self._vectors, vectors])
+            self._topics.extend(row[1] for row in rows)
+            self._created = np.concatenate([self._created, [row[3] for row in rows]])
+            self._last_id = rows[-1][0]
+        
+        # Rows are in insertion order: drop expired ones, then the oldest over the cap
+        keep = int(np.searchsorted(self._created, cutoff))
+        keep = max(keep, len(self._topics) - self.max_entries)
+        if keep:
+            self._vectors = self._vectors[keep:]
+            self._topics = self._topics[keep:]
+            self._created = self._created[keep:]
+    
+    def add(self, topic: str, vector: np.ndarray) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            # A re-answered topic gets a new id so every worker picks it up again
+            conn.execute(
+                "INSERT OR REPLACE INTO semantic_index (namespace, topic, vector, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, topic, vector.astype(np.float32).tobytes(), now)
+            )
+            conn.execute(
+                "DELETE FROM semantic_index WHERE namespace = ? AND (created_at < ? OR id <= ("
+                " SELECT id FROM semantic_index WHERE namespace = ? ORDER BY id DESC LIMIT 1 OFFSET ?))",
+                (self.namespace, now - self.ttl, self.namespace, self.max_entries)
+            )
+    
+    def search(self, vector: np.ndarray) -> Optional[tuple]:
+        """Return (topic, similarity) of the nearest entry, or None when empty."""
+        with self._lock:
+            self._refresh()
+            if not self._topics:
+                return None
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            return self._topics[best], float(scores[best])
+    
+    def __len__(self) -> int:
+        return len(self._topics)
+
+
+@dataclass
+class SemanticLookup:
+    vector: np.ndarray
+    topic: Optional[str] = None
+    similarity: float = 0.0
+    # "result": reuse the whole cached response, "strategy": reuse only the
+    # strategist output, None: miss
+    kind: Optional[str] = None
+
+
+class SemanticCache:
+    """
+    Maps a topic to the nearest previously answered topic. Above
+    result_threshold the cached response of that topic is reused as is; above
+    the lower strategy_threshold only its weekly strategy is reused and the
+    tweets are generated fresh.
+    
+    lookup() only classifies; what was actually reused is reported with
+    record(): by the caller for a result or a miss, and by the strategist for
+    a strategy match, once StageMemo did (or did not) serve the neighbour's
+    memoized strategy.
+    """
+    
+    def __init__(self, embedder, index: VectorIndex, result_threshold: float, strategy_threshold: float):
+        self.embedder = embedder
+        self.index = index
+        self.result_threshold = result_threshold
+        self.strategy_threshold = strategy_threshold
+        self._similarities: Deque[float] = deque(maxlen=1000)
+        self.stats = {
+            "lookups": 0,
+            "result_hits": 0,
+            "strategy_hits": 0,
+            "misses": 0,
+            "errors": 0,
+        }
+    
+    async def lookup(self, topic_context: str) -> Optional[SemanticLookup]:
+        """Nearest cached topic for topic_context; None if embedding failed."""
+        topic = normalize_topic(topic_context)
+        try:
+            vector = await self.embedder.aembed(topic)
+            nearest = await asyncio.to_thread(self.index.search, vector)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("semantic cache lookup failed", extra={"error": str(e)})
+            return None
+        
+        self.stats["lookups"] += 1
+        lookup = SemanticLookup(vector)
+        if nearest is not None:
+            lookup.topic, lookup.similarity = nearest
+            SEMANTIC_SIMILARITY.observe(lookup.similarity)
+            self._similarities.append(lookup.similarity)
+        
+        if lookup.topic is not None and normalize_topic(lookup.topic) == topic:
+            # Same normalized topic: the exact cache already had its chance
+            lookup.kind = None
+        elif lookup.similarity >= self.result_threshold:
+            lookup.kind = "result"
+        elif lookup.similarity >= self.strategy_threshold:
+            lookup.kind = "strategy"
+        return lookup
+    
+    def record(self, kind: Optional[str], cached_topic: Optional[str] = None) -> None:
+        """Count a lookup by what was reused: "result", "strategy" or None for nothing."""
+        if kind is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats[f"{kind}_hits"] += 1
+            logger.info("semantic cache hit", extra={"kind": kind, "cached_topic": cached_topic})
+    
+    async def add(self, topic_context: str, lookup: Optional[SemanticLookup]) -> None:
+        """Index a topic whose response was just cached, reusing the lookup's vector."""
+        try:
+            if lookup is not None:
+                vector = lookup.vector
+            else:
+                vector = await self.embedder.aembed(normalize_topic(topic_context))
+            # Stored as given: the strategist's stage cache is keyed on the raw topic
+            await asyncio.to_thread(self.index.add, topic_context, vector)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("semantic cache add failed", extra={"error": str(e)})
+    
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["result_hits"] + self.stats["strategy_hits"]
+        similarities = np.array(self._similarities) if self._similarities else None
+        return {
+            **self.stats,
+            "hit_rate": hits / self.stats["lookups"] if self.stats["lookups"] else 0.0,
+            "index_size": len(self.index),
+            "embedder": self.embedder.name,
+            "result_threshold": self.result_threshold,
+            "strategy_threshold": self.strategy_threshold,
+            # Nearest-neighbour similarity of recent lookups, to tune the thresholds
+            "similarity": {
+                "p10": float(np.percentile(similarities, 10)),
+                "p50": float(np.percentile(similarities, 50)),
+                "p90": float(np.percentile(similarities, 90)),
+                "max": float(similarities.max()),
+            } if similarities is not None else {},
+        }
+
+
+def build_embedder():
+    """
+    SEMANTIC_CACHE_EMBEDDER=hashing (default, local and free) or openai.
+    The openai embedder catches real paraphrases but costs one embedding
+    call on every exact-cache miss.
+    """
+    if os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing") == "openai":
+        return OpenAIEmbedder()
+    return HashingEmbedder(int(_env_float("SEMANTIC_CACHE_HASHING_DIM", 1024)))
+
+
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache(version: Dict[str, Any]) -> Optional[SemanticCache]:
+    """
+    Shared semantic cache for the pipeline version, None when
+    SEMANTIC_CACHE_ENABLED=0. Entries of other versions or embedders are
+    kept on disk but never matched. Entries live as long as the cached
+    results (RESULT_CACHE_TTL_SECONDS), at most SEMANTIC_CACHE_MAX_ENTRIES.
+    """
+    global _semantic_cache
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "0":
+        return None
+    if _semantic_cache is None:
+        embedder = build_embedder()
+        index = VectorIndex(
+            os.path.join(cache_dir(), "cache.sqlite3"),
+            make_cache_key("semantic", embedder.name, version),
+            embedder.dim,
+            ttl=_env_int("RESULT_CACHE_TTL_SECONDS", 24 * 60 * 60),
+            max_entries=_env_int("SEMANTIC_CACHE_MAX_ENTRIES", 10000)
+        )
+        _semantic_cache = SemanticCache(
+            embedder,
+            index,
+            result_threshold=_env_float("SEMANTIC_CACHE_RESULT_THRESHOLD", embedder.result_threshold),
+            strategy_threshold=_env_float("SEMANTIC_CACHE_STRATEGY_THRESHOLD", embedder.strategy_threshold),
+        )
+    return _semantic_cache
@@ -0,0 +1,115 @@
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .result_cache import TwoTierCache, build_two_tier_cache, make_cache_key
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+_stage_cache: Optional[TwoTierCache] = None
+
+
+def get_stage_cache() -> Optional[TwoTierCache]:
+    """Shared cache of per-agent outputs, None when STAGE_CACHE_ENABLED=0."""
+    global _stage_cache
+    if os.getenv("STAGE_CACHE_ENABLED", "1") == "0":
+        return None
+    if _stage_cache is None:
+        _stage_cache = build_two_tier_cache("stages", "STAGE_CACHE")
+    return _stage_cache
+
+
+def _report_similar(similar, on_similar, served: bool) -> None:
+    if similar is not None and on_similar is not None:
+        on_similar(served)
+
+
+class StageMemo:
+    """
+    Memoizes each agent's output keyed by the hash of that agent's input
+    (topic for the strategist, strategy JSON for the creator, tweets JSON for
+    the optimizer), so a retried run only pays for the stages that did not finish.
+    
+    `run` returns (output, tokens, model that answered or None); run / arun
+    return (output, tokens_spent, tokens_saved, model), the model being the
+    one that produced the output, cached or not. `similar` is the
+    payload of a near-duplicate input (from the semantic cache) whose cached
+    output is acceptable when this payload has none; `on_similar` is then
+    called with whether that output was served.
+    """
+    
+    def __init__(self, cache: Optional[TwoTierCache], version: Dict[str, Any]):
+        self.cache = cache
+        self.version = version
+    
+    def _model(self, stage: str, model: Optional[str]) -> str:
+        # Unknown for entries cached before models were recorded: assume the primary
+        return model or self.version["models"][stage][0]
+    
+    def key(self, stage: str, payload: Dict[str, Any]) -> str:
+        return make_cache_key(
+            "stage",
+            stage,
+            self.version["models"].get(stage),
+            self.version["prompts"].get(stage),
+            self.version.get("prompt_style"),
+            self.version.get("structured_output"),
+            payload
+        )
+    
+    async def arun(
+        self,
+        stage: str,
+        payload: Dict[str, Any],
+        run: Callable[[], Awaitable[Tuple[Any, int, Optional[str]]]],
+        similar: Optional[Dict[str, Any]] = None,
+        on_similar: Optional[Callable[[bool], None]] = None
+    ) -> Tuple[Any, int, int, str]:
+        if self.cache is None:
+            _report_similar(similar, on_similar, False)
+            output, tokens, model = await run()
+            return output, tokens, 0, self._model(stage, model)
+        
+        key = self.key(stage, payload)
+        cached = await self.cache.get(key)
+        served_similar = False
+        if cached is None and similar is not None:
+            cached = await self.cache.get(self.key(stage, similar))
+            served_similar = cached is not None
+        _report_similar(similar, on_similar, served_similar)
+        if cached is not None:
+            logger.info("stage cache hit", extra={"stage": stage, "tokens_saved": cached["tokens"]})
+            return cached["output"], 0, cached["tokens"], self._model(stage, cached.get("model"))
+        
+        output, tokens, model = await run()
+        await self.cache.set(key, {"output": output, "tokens": tokens, "model": model})
+        return output, tokens, 0, self._model(stage, model)
+    
+    def run(
+        self,
+        stage: str,
+        payload: Dict[str, Any],
+        run: Callable[[], Tuple[Any, int, Optional[str]]],
+        similar: Optional[Dict[str, Any]] = None,
+        on_similar: Optional[Callable[[bool], None]] = None
+    ) -> Tuple[Any, int, int, str]:
+        if self.cache is None:
+            _report_similar(similar, on_similar, False)
+            output, tokens, model = run()
+            return output, tokens, 0, self._model(stage, model)
+        
+        key = self.key(stage, payload)
+        cached = self.cache.get_sync(key)
+        served_similar = False
+        if cached is None and similar is not None:
+            cached = self.cache.get_sync(self.key(stage, similar))
+            served_similar = cached is not None
+        _report_similar(similar, on_similar, served_similar)
+        if cached is not None:
+            logger.info("stage cache hit", extra={"stage": stage, "tokens_saved": cached["tokens"]})
+            return cached["output"], 0, cached["tokens"], self._model(stage, cached.get("model"))
+        
+        output, tokens, model = run()
+        self.cache.set_sync(key, {"output": output, "tokens": tokens, "model": model})
+        return output, tokens, 0, self._model(stage, model)
@@ -1,44 +1,93 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.callbacks import get_openai_callback
+from langchain_core.runnables import RunnableLambda
 
-from ..constants.ai_models import OpenAIModel
+from .structured_output import StructuredOutputParser
+from ..promtps.prompt_format import format_instructions
 from ..promtps.content_strategist_prompt import CONTENT_STRATEGIST_PROMPT
 from ...model.agents import WeeklyContentStrategy
+from ...callbacks.token_usage import attach_token_usage
+from ..services.metrics import instrument_node
+from ..services.structured_logging import get_logger
 
+logger = get_logger(__name__)
 
-def content_strategist_agent(state):
-    print("--- CONTENT STRATEGIST AGENT ---")
-    
-    state_dict = state["keys"]
-    topic_context = state_dict["topic_context"]
+
+def build_content_strategist_chain(llm):
+    return CONTENT_STRATEGIST_PROMPT(
+        format_instructions=format_instructions(WeeklyContentStrategy)
+    ) | llm | StructuredOutputParser(output_model=WeeklyContentStrategy)
+
+
+def make_content_strategist_agent(chain, memo):
+    """
+    Graph node for the Content Strategist. Runs async under ainvoke/astream
+    and falls back to the sync implementation under invoke/stream.
+    """
     
-    llm = ChatOpenAI(
-        model_name=OpenAIModel.GPT_4_OMNI_MINI.value, 
-        temperature=0, 
-        streaming=False
-    )
+    def similar_inputs(state):
+        # Near-duplicate topic found by the semantic cache, whose strategy can be reused
+        strategy_topic = state["keys"].get("strategy_topic")
+        return {"topic_context": strategy_topic} if strategy_topic else None
     
-    parser = JsonOutputParser(pydantic_object=WeeklyContentStrategy)
+    def count_reuse(state):
+        # The semantic cache counts a strategy hit only when the memo served it
+        def on_similar(served):
+            from ..cache.semantic_cache import get_semantic_cache
+            
+            semantic = get_semantic_cache(memo.version)
+            if semantic is not None:
+                semantic.record("strategy" if served else None, state["keys"]["strategy_topic"])
+        return on_similar
     
-    chain = CONTENT_STRATEGIST_PROMPT(
-        format_instructions=parser.get_format_instructions
-    ) | llm | parser
+    def build_output(topic_context, strategy, tokens, saved):
+        logger.info(
+            "content strategist finished",
+            extra={"tokens": tokens, "tokens_saved": saved, "weekly_strategy": strategy}
+        )
+        
+        return {
+            "keys": {
+                "topic_context": topic_context,
+                "weekly_strategy": strategy,
+                "tokens_used": {
+                    "strategist": tokens
+                },
+                "tokens_saved": {
+                    "strategist": saved
+                }
+            }
+        }
     
-    with get_openai_callback() as cb:
-        strategy = chain.invoke({"topic_context": topic_context})
-        print(f"Strategist Tokens: {cb.total_tokens}")
+    @instrument_node("content_strategist")
+    def content_strategist_agent(state, config):
+        topic_context = state["keys"]["topic_context"]
+        inputs = {"topic_context": topic_context}
+        
+        def run():
+            run_config, usage = attach_token_usage(config)
+            # State and caches hold plain dicts
+            strategy = chain.invoke(inputs, config=run_config).model_dump()
+            return strategy, usage.total_tokens, usage.model
+        
+        strategy, tokens, saved, _ = memo.run("content_strategist", inputs, run, similar_inputs(state), count_reuse(state))
+        
+        return build_output(topic_context, strategy, tokens, saved)
     
-    print("weekly_strategie: ", strategy)
+    @instrument_node("content_strategist")
+    async def acontent_strategist_agent(state, config):
+        topic_context = state["keys"]["topic_context"]
+        inputs = {"topic_context": topic_context}
+        
+        async def run():
+            run_config, usage = attach_token_usage(config)
+            strategy = (await chain.ainvoke(inputs, config=run_config)).model_dump()
+            return strategy, usage.total_tokens, usage.model
+        
+        strategy, tokens, saved, _ = await memo.arun("content_strategist", inputs, run, similar_inputs(state), count_reuse(state))
+        
+        return build_output(topic_context, strategy, tokens, saved)
     
-    return {
-        "keys": {
-            "topic_context": topic_context,
-            "weekly_strategy": strategy,
-            "tokens_used": {
-                "strategist": cb.total_tokens
-            }
-        }
-    }
-
-
+    return RunnableLambda(
+        content_strategist_agent,
+        afunc=acontent_strategist_agent,
+        name="content_strategist"
+    )
@@ -0,0 +1,77 @@
+from langchain_core.runnables import RunnableLambda
+
+from .structured_output import StructuredOutputParser
+from .quality_optimizer_chain import build_response
+from .tweet_creator_chain import TWEETS_PER_WEEK
+from ..promtps.prompt_format import format_instructions
+from ..promtps.express_prompt import EXPRESS_PROMPT
+from ...model.agents import OptimizedWeeklyContent
+from ...callbacks.token_usage import attach_token_usage
+from ..services.metrics import instrument_node
+from ..services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def build_express_chain(llm):
+    return EXPRESS_PROMPT(
+        format_instructions=format_instructions(OptimizedWeeklyContent)
+    ) | llm | StructuredOutputParser(output_model=OptimizedWeeklyContent)
+
+
+def make_express_agent(chain, memo):
+    """
+    Graph node for express mode: strategy, tweets and polish in one structured
+    LLM call, answering with the same response shape as the Quality Optimizer.
+    Runs async under ainvoke/astream and falls back to the sync implementation
+    under invoke/stream.
+    """
+    
+    def build_input(state_dict):
+        return {
+            "topic_context": state_dict["topic_context"],
+            "tweet_count": TWEETS_PER_WEEK
+        }
+    
+    def build_output(state_dict, content, tokens, saved, model):
+        logger.info(
+            "express agent finished",
+            extra={"tokens": tokens, "tokens_saved": saved, "optimized_content": content}
+        )
+        
+        return build_response(state_dict, content["weekly_tweets"], content["key_tips"], model, tokens, saved, stage="express")
+    
+    @instrument_node("express")
+    def express_agent(state, config):
+        state_dict = state["keys"]
+        inputs = build_input(state_dict)
+        
+        def run():
+            run_config, usage = attach_token_usage(config)
+            # State and caches hold plain dicts
+            content = chain.invoke(inputs, config=run_config).model_dump()
+            return content, usage.total_tokens, usage.model
+        
+        content, tokens, saved, model = memo.run("express", inputs, run)
+        
+        return build_output(state_dict, content, tokens, saved, model)
+    
+    @instrument_node("express")
+    async def aexpress_agent(state, config):
+        state_dict = state["keys"]
+        inputs = build_input(state_dict)
+        
+        async def run():
+            run_config, usage = attach_token_usage(config)
+            content = (await chain.ainvoke(inputs, config=run_config)).model_dump()
+            return content, usage.total_tokens, usage.model
+        
+        content, tokens, saved, model = await memo.arun("express", inputs, run)
+        
+        return build_output(state_dict, content, tokens, saved, model)
+    
+    return RunnableLambda(
+        express_agent,
+        afunc=aexpress_agent,
+        name="express"
+    )
@@ -1,67 +1,151 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.callbacks import get_openai_callback
-import json
+import uuid
 
-from ..constants.ai_models import OpenAIModel
+from langchain_core.runnables import RunnableLambda
+
+from .structured_output import StructuredOutputParser
+from ..promtps.prompt_format import format_instructions, serialize_state
 from ..promtps.quality_optimizer_prompt import QUALITY_OPTIMIZER_PROMPT
 from ...model.agents import OptimizedWeeklyContent
+from ...callbacks.token_usage import attach_token_usage
+from ..services.metrics import instrument_node
+from ..services.structured_logging import get_logger
 
+logger = get_logger(__name__)
 
-def quality_optimizer_agent(state):
-    print("--- QUALITY OPTIMIZER AGENT ---")
-    
-    state_dict = state["keys"]
-    topic_context = state_dict["topic_context"]
-    generated_tweets = state_dict["generated_tweets"]
-    
-    # Convert tweets to string for prompt
-    tweets_str = json.dumps(generated_tweets, indent=2)
-    
-    llm = ChatOpenAI(
-        model_name=OpenAIModel.GPT_4_OMNI_MINI.value, 
-        temperature=0,  # Balanced for optimization
-        streaming=False
-    )
-    
-    parser = JsonOutputParser(pydantic_object=OptimizedWeeklyContent)
-    
-    chain = QUALITY_OPTIMIZER_PROMPT(
-        format_instructions=parser.get_format_instructions
-    ) | llm | parser
-    
-    with get_openai_callback() as cb:
-        optimized_content = chain.invoke({
-            "generated_tweets": tweets_str,
-            "topic_context": topic_context
-        })
-        print(f"Optimizer Tokens: {cb.total_tokens}")
-        print(f"Optimized content: {optimized_content}")
-    
-    tokens_used = state_dict.get("tokens_used", {})
-    tokens_used["optimizer"] = cb.total_tokens
+
+def build_quality_optimizer_chain(llm):
+    return QUALITY_OPTIMIZER_PROMPT(
+        format_instructions=format_instructions(OptimizedWeeklyContent)
+    ) | llm | StructuredOutputParser(output_model=OptimizedWeeklyContent)
+
+
+def build_response(state_dict, tweets, tips, model, tokens, saved, stage="optimizer"):
+    """
+    Final response of a run. `tokens`/`saved` are those of the last LLM stage:
+    the optimizer (0 when the validator skipped it) or the express agent.
+    """
+    tokens_used = dict(state_dict.get("tokens_used", {}))
+    tokens_used[stage] = tokens
     tokens_used["total"] = sum(tokens_used.values())
     
-    # Extract tweets - handle both dict and object access
-    if isinstance(optimized_content, dict):
-        tweets = optimized_content.get("weekly_tweets", [])
-        tips = optimized_content.get("key_tips", "")
-    else:
-        tweets = optimized_content.weekly_tweets
-        tips = optimized_content.key_tips
+    # Tokens that stage memoization avoided spending on this run
+    tokens_saved = dict(state_dict.get("tokens_saved", {}))
+    tokens_saved[stage] = saved
+    tokens_used["saved"] = sum(tokens_saved.values())
     
     return {
         "keys": {
             "response": {
+                # Handle for /supervisor-agent/regenerate
+                "result_id": uuid.uuid4().hex,
                 "tweets": tweets,
                 "tips": tips,
                 "models": {
                     "chat": {
-                        "model": OpenAIModel.GPT_4_OMNI_MINI.value,
+                        "model": model,
                         "tokens": tokens_used
                     }
                 }
+            },
+            # Context stored with the result to regenerate a single tweet later
+            "result": {
+                "topic_context": state_dict["topic_context"],
+                "weekly_strategy": state_dict.get("weekly_strategy")
             }
         }
     }
 
+
+def make_quality_optimizer_agent(chain, memo):
+    """
+    Graph node for the Quality Optimizer. Runs async under ainvoke/astream
+    and falls back to the sync implementation under invoke/stream.
+    
+    When the tweet validator ran, only the tweets it failed are sent, with
+    their issues, and the polished ones replace them in place.
+    """
+    
+    def failing_tweets(state_dict):
+        tweets = state_dict["generated_tweets"]["tweets"]
+        validation = state_dict.get("validation")
+        if not validation:
+            return list(range(len(tweets))), tweets
+        
+        indices = validation["failing"]
+        return indices, [
+            {**tweets[index], "issues": validation["issues"][index]}
+            for index in indices
+        ]
+    
+    def build_input(state_dict):
+        _, tweets = failing_tweets(state_dict)
+        
+        # Convert tweets to string for prompt
+        tweets_str = serialize_state({"tweets": tweets})
+        
+        return {
+            "generated_tweets": tweets_str,
+            "tweet_count": len(tweets),
+            "topic_context": state_dict["topic_context"]
+        }
+    
+    def build_output(state_dict, optimized_content, tokens, saved, model):
+        logger.info(
+            "quality optimizer finished",
+            extra={"tokens": tokens, "tokens_saved": saved, "optimized_content": optimized_content}
+        )
+        
+        # Extract tweets - handle both dict and object access
+        if isinstance(optimized_content, dict):
+            optimized = optimized_content.get("weekly_tweets", [])
+            tips = optimized_content.get("key_tips", "")
+        else:
+            optimized = optimized_content.weekly_tweets
+            tips = optimized_content.key_tips
+        
+        # Put the polished tweets back in place of the failing ones; a tweet the
+        # optimizer did not return is kept as generated
+        indices, _ = failing_tweets(state_dict)
+        tweets = [
+            {"tweet_text": tweet["tweet_text"], "content_type": tweet["content_type"]}
+            for tweet in state_dict["generated_tweets"]["tweets"]
+        ]
+        for index, tweet in zip(indices, optimized):
+            tweets[index] = tweet
+        
+        return build_response(state_dict, tweets, tips, model, tokens, saved)
+    
+    @instrument_node("quality_optimizer")
+    def quality_optimizer_agent(state, config):
+        state_dict = state["keys"]
+        inputs = build_input(state_dict)
+        
+        def run():
+            run_config, usage = attach_token_usage(config)
+            # State and caches hold plain dicts
+            optimized_content = chain.invoke(inputs, config=run_config).model_dump()
+            return optimized_content, usage.total_tokens, usage.model
+        
+        optimized_content, tokens, saved, model = memo.run("quality_optimizer", inputs, run)
+        
+        return build_output(state_dict, optimized_content, tokens, saved, model)
+    
+    @instrument_node("quality_optimizer")
+    async def aquality_optimizer_agent(state, config):
+        state_dict = state["keys"]
+        inputs = build_input(state_dict)
+        
+        async def run():
+            run_config, usage = attach_token_usage(config)
+            optimized_content = (await chain.ainvoke(inputs, config=run_config)).model_dump()
+            return optimized_content, usage.total_tokens, usage.model
+        
+        optimized_content, tokens, saved, model = await memo.arun("quality_optimizer", inputs, run)
+        
+        return build_output(state_dict, optimized_content, tokens, saved, model)
+    
+    return RunnableLambda(
+        quality_optimizer_agent,
+        afunc=aquality_optimizer_agent,
+        name="quality_optimizer"
+    )
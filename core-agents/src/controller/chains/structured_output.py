@@ -0,0 +1,188 @@
+import copy
+import json
+import re
+from typing import Any, Dict, List, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.outputs import Generation
+from langchain_core.runnables import Runnable
+from langchain_core.utils.json import parse_json_markdown
+from pydantic import BaseModel, ValidationError
+
+from ..promtps.prompt_format import structured_output_mode
+from ..services.metrics import PARSE_REPAIRS
+from ..services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def strict_json_schema(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema of a pydantic model in the shape OpenAI's strict structured
+    outputs require: every object closed and every property required.
+    """
+    json_schema = copy.deepcopy(schema.model_json_schema())
+    
+    def close(node):
+        if isinstance(node, dict):
+            if node.get("type") == "object" and "properties" in node:
+                node["additionalProperties"] = False
+                node["required"] = list(node["properties"])
+            for value in node.values():
+                close(value)
+        elif isinstance(node, list):
+            for value in node:
+                close(value)
+    
+    close(json_schema)
+    return json_schema
+
+
+def bind_structured_output(llm: Runnable, provider: str, schema: Type[BaseModel]) -> Runnable:
+    """
+    Make one chat model answer in the schema natively, per STRUCTURED_OUTPUT:
+    - json_schema: OpenAI strict response_format, other providers fall back to tool calling
+    - function_calling: a forced tool call whose arguments are the output
+    - prompt: unchanged, the prompt carries the format instructions
+    The model still returns an AIMessage; StructuredOutputParser does the parsing.
+    """
+    mode = structured_output_mode()
+    if mode == "prompt":
+        return llm
+    
+    if mode == "json_schema" and provider == "openai":
+        return llm.bind(response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": schema.__name__,
+                "strict": True,
+                "schema": strict_json_schema(schema),
+            },
+        })
+    
+    return llm.bind_tools([schema], tool_choice=schema.__name__)
+
+
+def _raw_output(message: Any) -> Any:
+    """Tool call arguments when the model called the tool, otherwise the text."""
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return tool_calls[0]["args"]
+    
+    # Arguments that did not parse as JSON are kept as a string
+    invalid_tool_calls = getattr(message, "invalid_tool_calls", None)
+    if invalid_tool_calls:
+        return invalid_tool_calls[0].get("args") or ""
+    
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse model JSON without another LLM call: strips markdown fences and
+    prose around the object, drops trailing commas and closes strings,
+    arrays and objects of truncated output.
+    """
+    try:
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        pass
+    
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start > 0 and "```" not in text[:start]:
+        text = text[start:]
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    
+    # parse_json_markdown closes whatever a truncated answer left open
+    return parse_json_markdown(text)
+
+
+def _coerce(data: Any, schema: Type[BaseModel]) -> Any:
+    """Fix the shapes models commonly get wrong around a valid payload."""
+    fields = schema.model_fields
+    
+    # {"WeeklyTweetsPlan": {...}} or {"properties": {...}}
+    if isinstance(data, dict) and len(data) == 1 and not set(data) & set(fields):
+        (inner,) = data.values()
+        if isinstance(inner, (dict, list)):
+            data = inner
+    
+    # A bare list for a model with a single list field
+    list_fields = [name for name, field in fields.items() if getattr(field.annotation, "__origin__", None) in (list, List)]
+    if isinstance(data, list) and len(list_fields) == 1:
+        data = {list_fields[0]: data}
+    
+    return data
+
+
+def _drop_invalid_items(data: Any, error: ValidationError) -> Any:
+    """Drop the list items that failed validation, e.g. the last one of a truncated answer."""
+    doomed = set()
+    for detail in error.errors():
+        loc = detail["loc"]
+        index = next((i for i, part in enumerate(loc) if isinstance(part, int)), None)
+        if index is not None:
+            doomed.add(loc[:index + 1])
+    
+    # Highest index first so earlier deletions do not shift later ones
+    for loc in sorted(doomed, key=lambda loc: loc[-1], reverse=True):
+        container = data
+        for part in loc[:-1]:
+            container = container[part]
+        del container[loc[-1]]
+    return data
+
+
+class StructuredOutputParser(BaseOutputParser):
+    """
+    Parses an agent's AIMessage (text or tool call) into its validated pydantic
+    v2 model. Malformed or truncated JSON and wrapped payloads are repaired
+    locally; only output that still does not validate raises.
+    """
+    
+    output_model: Type[BaseModel]
+    
+    @property
+    def _type(self) -> str:
+        return "structured_output"
+    
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> BaseModel:
+        generation = result[0]
+        raw = _raw_output(getattr(generation, "message", None) or generation.text)
+        return self._validate(raw)
+    
+    def parse(self, text: str) -> BaseModel:
+        return self._validate(text)
+    
+    def _validate(self, raw: Any) -> BaseModel:
+        if isinstance(raw, dict):
+            try:
+                return self.output_model.model_validate(raw)
+            except ValidationError:
+                data = raw
+        else:
+            try:
+                return self.output_model.model_validate_json(raw)
+            except (ValidationError, ValueError, TypeError):
+                pass
+            try:
+                data = repair_json(raw)
+            except Exception as e:
+                raise OutputParserException(f"Could not parse {self.output_model.__name__}: {e}", llm_output=str(raw))
+        
+        data = _coerce(data, self.output_model)
+        try:
+            parsed = self.output_model.model_validate(data)
+        except ValidationError as e:
+            try:
+                parsed = self.output_model.model_validate(_drop_invalid_items(data, e))
+            except (ValidationError, LookupError, TypeError):
+                raise OutputParserException(f"Invalid {self.output_model.__name__}: {e}", llm_output=str(raw))
+        
+        PARSE_REPAIRS.labels(self.output_model.__name__).inc()
+        logger.info("repaired llm output", extra={"schema": self.output_model.__name__})
+        return parsed
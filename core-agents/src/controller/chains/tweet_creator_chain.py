@@ -1,52 +1,143 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.callbacks import get_openai_callback
-import json
+from langchain_core.runnables import RunnableLambda
+from langgraph.constants import Send
 
-from ..constants.ai_models import OpenAIModel
+from .structured_output import StructuredOutputParser
+from ..promtps.prompt_format import format_instructions, serialize_state
 from ..promtps.tweet_creator_prompt import TWEET_CREATOR_PROMPT
 from ...model.agents import WeeklyTweetsPlan
+from ...callbacks.token_usage import attach_token_usage
+from ..services.metrics import instrument_node
+from ..services.structured_logging import get_logger
 
+logger = get_logger(__name__)
 
-def tweet_creator_agent(state):
-    print("--- TWEET CREATOR AGENT ---")
-    
+TWEETS_PER_WEEK = 5
+
+
+def build_tweet_creator_chain(llm):
+    return TWEET_CREATOR_PROMPT(
+        format_instructions=format_instructions(WeeklyTweetsPlan)
+    ) | llm | StructuredOutputParser(output_model=WeeklyTweetsPlan)
+
+
+def fan_out_angles(state):
+    """
+    Conditional edge after the Content Strategist: one tweet_creator branch per
+    content angle, splitting the weekly tweets between them. The branches run
+    concurrently and merge_tweets joins them.
+    """
     state_dict = state["keys"]
-    topic_context = state_dict["topic_context"]
     weekly_strategy = state_dict["weekly_strategy"]
+    angles = weekly_strategy.get("content_angles") or [weekly_strategy.get("main_topic", state_dict["topic_context"])]
+    angles = angles[:TWEETS_PER_WEEK]
     
-    # Convert strategy to string for prompt
-    strategy_str = json.dumps(weekly_strategy, indent=2)
+    sends = []
+    for index, angle in enumerate(angles):
+        tweet_count = TWEETS_PER_WEEK // len(angles) + (1 if index < TWEETS_PER_WEEK % len(angles) else 0)
+        sends.append(Send("tweet_creator", {
+            "keys": state_dict,
+            "angle_index": index,
+            "content_angle": angle,
+            "tweet_count": tweet_count
+        }))
     
-    llm = ChatOpenAI(
-        model_name=OpenAIModel.GPT_4_OMNI_MINI.value, 
-        temperature=0,  # Higher temp for creativity
-        streaming=False
-    )
+    return sends
+
+
+def make_tweet_creator_agent(chain, memo):
+    """
+    Graph node for one Tweet Creator branch (one content angle). Runs async
+    under ainvoke/astream and falls back to the sync implementation under
+    invoke/stream.
+    """
     
-    parser = JsonOutputParser(pydantic_object=WeeklyTweetsPlan)
+    def build_input(branch):
+        state_dict = branch["keys"]
+        
+        # Convert strategy to string for prompt
+        strategy_str = serialize_state(state_dict["weekly_strategy"])
+        
+        return {
+            "weekly_strategy": strategy_str,
+            "topic_context": state_dict["topic_context"],
+            "content_angle": branch["content_angle"],
+            "tweet_count": branch["tweet_count"]
+        }
     
-    chain = TWEET_CREATOR_PROMPT(
-        format_instructions=parser.get_format_instructions
-    ) | llm | parser
+    def build_output(branch, tweets_plan, tokens, saved, model):
+        logger.info(
+            "tweet creator branch finished",
+            extra={"angle_index": branch["angle_index"], "tokens": tokens, "tokens_saved": saved}
+        )
+        
+        return {
+            "angle_tweets": [{
+                "angle_index": branch["angle_index"],
+                "tweets": tweets_plan.get("tweets", []),
+                "tokens": tokens,
+                "saved": saved,
+                "model": model
+            }]
+        }
     
-    with get_openai_callback() as cb:
-        tweets_plan = chain.invoke({
-            "weekly_strategy": strategy_str,
-            "topic_context": topic_context
-        })
-        print(f"Creator Tokens: {cb.total_tokens}")
+    @instrument_node("tweet_creator")
+    def tweet_creator_agent(branch, config):
+        inputs = build_input(branch)
+        
+        def run():
+            run_config, usage = attach_token_usage(config)
+            # State and caches hold plain dicts
+            tweets_plan = chain.invoke(inputs, config=run_config).model_dump()
+            return tweets_plan, usage.total_tokens, usage.model
+        
+        tweets_plan, tokens, saved, model = memo.run("tweet_creator", inputs, run)
+        
+        return build_output(branch, tweets_plan, tokens, saved, model)
+    
+    @instrument_node("tweet_creator")
+    async def atweet_creator_agent(branch, config):
+        inputs = build_input(branch)
+        
+        async def run():
+            run_config, usage = attach_token_usage(config)
+            tweets_plan = (await chain.ainvoke(inputs, config=run_config)).model_dump()
+            return tweets_plan, usage.total_tokens, usage.model
+        
+        tweets_plan, tokens, saved, model = await memo.arun("tweet_creator", inputs, run)
+        
+        return build_output(branch, tweets_plan, tokens, saved, model)
+    
+    return RunnableLambda(
+        tweet_creator_agent,
+        afunc=atweet_creator_agent,
+        name="tweet_creator"
+    )
+
+
+def merge_tweets(state):
+    """Join the per-angle branches into one WeeklyTweetsPlan, in angle order."""
+    state_dict = state["keys"]
+    branches = sorted(state["angle_tweets"], key=lambda branch: branch["angle_index"])
+    
+    tweets = [tweet for branch in branches for tweet in branch["tweets"]]
+    # Branches may have been answered by different models (fallback, hedging)
+    models = ", ".join(dict.fromkeys(branch["model"] for branch in branches))
     
-    tokens_used = state_dict.get("tokens_used", {})
-    tokens_used["creator"] = cb.total_tokens
+    tokens_used = dict(state_dict.get("tokens_used", {}))
+    tokens_used["creator"] = sum(branch["tokens"] for branch in branches)
+    tokens_saved = dict(state_dict.get("tokens_saved", {}))
+    tokens_saved["creator"] = sum(branch["saved"] for branch in branches)
     
     return {
         "keys": {
-            "topic_context": topic_context,
-            "weekly_strategy": weekly_strategy,
-            "generated_tweets": tweets_plan,
-            "tokens_used": tokens_used
+            "topic_context": state_dict["topic_context"],
+            "weekly_strategy": state_dict["weekly_strategy"],
+            "generated_tweets": {"tweets": tweets, "model": models},
+            "tokens_used": tokens_used,
+            "tokens_saved": tokens_saved
         }
     }
 
 
+async def amerge_tweets(state):
+    return merge_tweets(state)
@@ -0,0 +1,65 @@
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from .structured_output import StructuredOutputParser
+from ..promtps.prompt_format import format_instructions, serialize_state
+from ..promtps.tweet_regenerator_prompt import TWEET_REGENERATOR_PROMPT
+from ...model.agents import SimpleTweet
+from ...callbacks.token_usage import attach_token_usage
+from ..services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def build_tweet_regenerator_chain(llm):
+    return TWEET_REGENERATOR_PROMPT(
+        format_instructions=format_instructions(SimpleTweet)
+    ) | llm | StructuredOutputParser(output_model=SimpleTweet)
+
+
+def build_input(record: Dict[str, Any], index: int, feedback: Optional[str]) -> Dict[str, Any]:
+    """
+    Prompt input for one slot: the stored strategy (none in express mode) and
+    the sibling tweets as context, the rejected tweet and its content type.
+    """
+    tweets = record["response"]["tweets"]
+    strategy = record.get("weekly_strategy")
+    
+    return {
+        "weekly_strategy": serialize_state(strategy) if strategy else "not available",
+        "topic_context": record["topic_context"],
+        "other_tweets": serialize_state([tweet for position, tweet in enumerate(tweets) if position != index]),
+        "rejected_tweet": tweets[index]["tweet_text"],
+        "feedback": feedback or "none",
+        "content_type": tweets[index].get("content_type") or "educational"
+    }
+
+
+def patch_response(response: Dict[str, Any], index: int, tweet: Dict[str, Any], tokens: int) -> Dict[str, Any]:
+    """
+    Copy of a stored response with one tweet replaced, under a new result_id.
+    The regeneration tokens are added to the response's token counts.
+    """
+    tweets = list(response["tweets"])
+    tweets[index] = tweet
+    
+    chat = response["models"]["chat"]
+    tokens_used = dict(chat["tokens"])
+    tokens_used["regeneration"] = tokens_used.get("regeneration", 0) + tokens
+    tokens_used["total"] = tokens_used.get("total", 0) + tokens
+    
+    return {
+        **response,
+        "result_id": uuid.uuid4().hex,
+        "tweets": tweets,
+        "models": {**response["models"], "chat": {**chat, "tokens": tokens_used}}
+    }
+
+
+async def aregenerate_tweet(chain, record: Dict[str, Any], index: int, feedback: Optional[str], config=None) -> Tuple[Dict[str, Any], int]:
+    """One creator+optimizer LLM call for a single slot. Returns (tweet, tokens)."""
+    run_config, usage = attach_token_usage(config)
+    tweet = (await chain.ainvoke(build_input(record, index, feedback), config=run_config)).model_dump()
+    
+    logger.info("tweet regenerated", extra={"index": index, "tokens": usage.total_tokens})
+    return tweet, usage.total_tokens
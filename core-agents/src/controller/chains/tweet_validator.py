@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END
+
+from .quality_optimizer_chain import build_response
+from ..services.metrics import instrument_node, VALIDATOR_ISSUES, VALIDATOR_ROUTES
+from ..services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+MAX_TWEET_CHARS = 280
+# The opening line has to fit in the timeline preview to work as a hook
+MAX_HOOK_CHARS = 120
+
+HOOK_PATTERN = re.compile(
+    r"^(\d|how\b|why\b|what\b|stop\b|most\b|the (truth|secret|mistake)|here'?s\b|you\b|your\b|if you\b|never\b|\W)",
+    re.IGNORECASE
+)
+CTA_PATTERN = re.compile(
+    r"\b(reply|comment|share|retweet|repost|follow|bookmark|save this|try|drop|tag|let me know|"
+    r"what do you think|thoughts|click|link|dm|join|sign up|subscribe|start|learn more|read)\b|\?|👇|➡️",
+    re.IGNORECASE
+)
+
+# Soft checks lower a tweet's score, hard checks fail it outright
+SOFT_CHECKS = ("no_hook", "no_cta", "type_mix")
+HARD_CHECKS = ("empty", "too_long", "duplicate")
+
+
+@dataclass
+class ValidatorSettings:
+    enabled: bool = True
+    # Share of the soft checks a tweet has to pass
+    min_score: float = 0.6
+    # Estimated Jaccard similarity of word shingles above which a tweet is a near-duplicate
+    duplicate_threshold: float = 0.5
+    num_perm: int = 64
+    
+    @classmethod
+    def from_env(cls) -> "ValidatorSettings":
+        return cls(
+            enabled=os.getenv("TWEET_VALIDATOR_ENABLED", "1") != "0",
+            min_score=float(os.getenv("TWEET_VALIDATOR_MIN_SCORE", cls.min_score)),
+            duplicate_threshold=float(os.getenv("TWEET_VALIDATOR_DUPLICATE_THRESHOLD", cls.duplicate_threshold)),
+        )
+    
+    def version(self) -> Optional[tuple]:
+        """Part of the pipeline version: the validator decides which tweets are rewritten."""
+        return (self.min_score, self.duplicate_threshold, self.num_perm) if self.enabled else None
+
+
+@dataclass
+class ValidationReport:
+    # Issues of each tweet, in tweet order
+    issues: List[List[str]]
+    scores: List[float]
+    failing: List[int] = field(default_factory=list)
+    
+    @property
+    def passed(self) -> bool:
+        return not self.failing
+    
+    @property
+    def score(self) -> float:
+        return sum(self.scores) / len(self.scores) if self.scores else 0.0
+    
+    def to_state(self) -> Dict[str, Any]:
+        return {"issues": self.issues, "scores": self.scores, "failing": self.failing, "score": self.score}
+
+
+class MinHasher:
+    """
+    MinHash signatures of word 3-shingles: the share of equal signature slots
+    estimates the Jaccard similarity of two tweets' shingle sets.
+    """
+    
+    # Mersenne prime for the (a * x + b) mod p hash family
+    PRIME = (1 << 61) - 1
+    
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # 32-bit a, b and shingle hashes keep a * x + b below 2**64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    
+    @staticmethod
+    def shingles(text: str, size: int = 3) -> set:
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        if len(words) < size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array(
+            [
+                int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+                for shingle in self.shingles(text)
+            ] or [0],
+            dtype=np.uint64
+        )
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % self.PRIME
+        return permuted.min(axis=1)
+    
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        return float(np.mean(first == second))
+
+
+def _opening(text: str) -> str:
+    return re.split(r"(?<=[.!?:])\s|\n", text.strip(), maxsplit=1)[0]
+
+
+def has_hook(text: str) -> bool:
+    """A short opening line that is a question, exclamation, number or direct address."""
+    opening = _opening(text)
+    if not opening or len(opening) > MAX_HOOK_CHARS:
+        return False
+    return opening[-1] in "?!:" or bool(HOOK_PATTERN.match(opening))
+
+
+def has_cta(text: str) -> bool:
+    return bool(CTA_PATTERN.search(text))
+
+
+def validate_tweets(tweets: List[Dict[str, Any]], settings: ValidatorSettings) -> ValidationReport:
+    """
+    Score every tweet locally: length, hook, call to action, near-duplicates
+    of an earlier tweet and, across the batch, the mix of content types.
+    """
+    issues: List[List[str]] = [[] for _ in tweets]
+    
+    hasher = MinHasher(settings.num_perm)
+    signatures = []
+    for index, tweet in enumerate(tweets):
+        text = (tweet.get("tweet_text") or "").strip()
+        if not text:
+            issues[index].append("empty")
+            signatures.append(None)
+            continue
+        
+        if len(text) > MAX_TWEET_CHARS:
+            issues[index].append("too_long")
+        if not has_hook(text):
+            issues[index].append("no_hook")
+        if not has_cta(text):
+            issues[index].append("no_cta")
+        
+        signature = hasher.signature(text)
+        if any(
+            other is not None and hasher.similarity(signature, other) >= settings.duplicate_threshold
+            for other in signatures
+        ):
+            issues[index].append("duplicate")
+        signatures.append(signature)
+    
+    # With three or more tweets at least two content types; the repeats of the
+    # dominant type after its first tweet are the ones to change
+    types = [(tweet.get("content_type") or "").strip().lower() for tweet in tweets]
+    if len(tweets) >= 3 and len(set(types)) < 2:
+        dominant = Counter(types).most_common(1)[0][0]
+        for index in [i for i, kind in enumerate(types) if kind == dominant][1:]:
+            issues[index].append("type_mix")
+    
+    scores = []
+    failing = []
+    for index, tweet_issues in enumerate(issues):
+        score = 1 - sum(issue in SOFT_CHECKS for issue in tweet_issues) / len(SOFT_CHECKS)
+        scores.append(round(score, 3))
+        if score < settings.min_score or any(issue in HARD_CHECKS for issue in tweet_issues):
+            failing.append(index)
+        for issue in tweet_issues:
+            VALIDATOR_ISSUES.labels(issue).inc()
+    
+    return ValidationReport(issues, scores, failing)
+
+
+def local_tips(state_dict: Dict[str, Any]) -> str:
+    """Posting tips when the optimizer, which normally writes them, is skipped."""
+    audience = (state_dict.get("weekly_strategy") or {}).get("target_audience") or "your audience"
+    return (
+        f"Post one tweet a day at the hours your audience ({audience}) is most active, lead with the hook, "
+        "reply to every comment in the first hour and pin the tweet that performs best."
+    )
+
+
+def make_tweet_validator(memo, settings: ValidatorSettings):
+    """
+    Graph node between merge_tweets and the Quality Optimizer. When every tweet
+    passes, the final response is built here and the optimizer is skipped;
+    otherwise the report tells the optimizer which tweets to rewrite.
+    """
+    
+    @instrument_node("tweet_validator")
+    def tweet_validator(state, config):
+        state_dict = state["keys"]
+        tweets = state_dict["generated_tweets"]["tweets"]
+        report = validate_tweets(tweets, settings)
+        
+        route = "skip" if report.passed else "partial" if len(report.failing) < len(tweets) else "full"
+        VALIDATOR_ROUTES.labels(route).inc()
+        logger.info(
+            "tweet validator finished",
+            extra={"route": route, "score": report.score, "failing": report.failing, "issues": report.issues}
+        )
+        
+        if report.passed:
+            # The creator branches' models, as the optimizer did not run
+            model = state_dict["generated_tweets"].get("model") or memo.version["models"]["tweet_creator"][0]
+            return build_response(state_dict, tweets, local_tips(state_dict), model, 0, 0)
+        
+        return {"keys": {**state_dict, "validation": report.to_state()}}
+    
+    async def atweet_validator(state, config):
+        # Pure CPU work on five short strings
+        return tweet_validator(state, config)
+    
+    return RunnableLambda(tweet_validator, afunc=atweet_validator, name="tweet_validator")
+
+
+def route_after_validation(state) -> str:
+    """Conditional edge after the validator: END when it already built the response."""
+    return END if "response" in state["keys"] else "quality_optimizer"
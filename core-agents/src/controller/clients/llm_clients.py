@@ -0,0 +1,258 @@
+import asyncio
+import functools
+import os
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+import httpx
+
+from ..constants.ai_models import OpenAIModel, AnthropicModel, FireworksModel
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class HttpPoolSettings:
+    """Connection pool settings for one provider's httpx clients."""
+    
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+    
+    @classmethod
+    def from_env(cls, provider: str) -> "HttpPoolSettings":
+        """
+        Read LLM_HTTP_* variables, e.g. LLM_HTTP_MAX_CONNECTIONS.
+        A provider suffix overrides the global value, e.g. LLM_HTTP_TIMEOUT_ANTHROPIC.
+        """
+        def setting(name, default, parse):
+            return parse(f"LLM_HTTP_{name}_{provider.upper()}", parse(f"LLM_HTTP_{name}", default))
+        
+        return cls(
+            max_connections=setting("MAX_CONNECTIONS", cls.max_connections, _env_int),
+            max_keepalive_connections=setting("MAX_KEEPALIVE", cls.max_keepalive_connections, _env_int),
+            keepalive_expiry=setting("KEEPALIVE_EXPIRY", cls.keepalive_expiry, _env_float),
+            timeout=setting("TIMEOUT", cls.timeout, _env_float),
+            connect_timeout=setting("CONNECT_TIMEOUT", cls.connect_timeout, _env_float),
+        )
+    
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+    
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+_lock = threading.Lock()
+_sync_clients: Dict[str, httpx.Client] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_chat_models: Dict[Tuple, Any] = {}
+
+
+def provider_for(model: Enum) -> str:
+    if isinstance(model, OpenAIModel):
+        return "openai"
+    if isinstance(model, AnthropicModel):
+        return "anthropic"
+    if isinstance(model, FireworksModel):
+        return "fireworks"
+    raise ValueError(f"Unknown provider for model {model}")
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Return the process-wide pooled sync client for a provider."""
+    with _lock:
+        if provider not in _sync_clients:
+            settings = HttpPoolSettings.from_env(provider)
+            _sync_clients[provider] = httpx.Client(
+                limits=settings.limits(),
+                timeout=settings.timeouts(),
+            )
+        return _sync_clients[provider]
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Return the process-wide pooled async client for a provider."""
+    with _lock:
+        if provider not in _async_clients:
+            settings = HttpPoolSettings.from_env(provider)
+            _async_clients[provider] = httpx.AsyncClient(
+                limits=settings.limits(),
+                timeout=settings.timeouts(),
+            )
+        return _async_clients[provider]
+
+
+@functools.lru_cache(maxsize=None)
+def _chat_openai_class():
+    from langchain_openai import ChatOpenAI
+    
+    class _ChatOpenAI(ChatOpenAI):
+        async def _astream(self, *args, **kwargs):
+            # langchain-openai 0.1.20 does not await with_raw_response when
+            # async streaming with include_response_headers, so stream without
+            # the headers (the rate limiter still settles on token usage)
+            llm = self
+            if self.include_response_headers:
+                # The SDK clients are excluded fields, copy() would drop them
+                llm = self.copy(update={
+                    "include_response_headers": False,
+                    "client": self.client,
+                    "async_client": self.async_client
+                })
+            async for chunk in ChatOpenAI._astream(llm, *args, **kwargs):
+                yield chunk
+    
+    return _ChatOpenAI
+
+
+def _build_openai(model: OpenAIModel, **kwargs):
+    ChatOpenAI = _chat_openai_class()
+    
+    return ChatOpenAI(
+        model_name=model.value,
+        http_client=get_http_client("openai"),
+        http_async_client=get_async_http_client("openai"),
+        **kwargs
+    )
+
+
+def _build_anthropic(model: AnthropicModel, **kwargs):
+    import anthropic
+    from langchain_anthropic import ChatAnthropic
+    
+    llm = ChatAnthropic(model=model.value, **kwargs)
+    
+    # ChatAnthropic does not take an http client, so rebuild its SDK clients
+    # on top of the shared pools with the same credentials and settings.
+    client_params = {
+        "api_key": llm.anthropic_api_key.get_secret_value(),
+        "base_url": llm.anthropic_api_url,
+        "max_retries": llm.max_retries,
+        "default_headers": llm.default_headers,
+    }
+    object.__setattr__(llm, "_client", anthropic.Client(
+        http_client=get_http_client("anthropic"), **client_params
+    ))
+    object.__setattr__(llm, "_async_client", anthropic.AsyncClient(
+        http_client=get_async_http_client("anthropic"), **client_params
+    ))
+    
+    return llm
+
+
+def _build_fireworks(model: FireworksModel, **kwargs):
+    from langchain_fireworks import ChatFireworks
+    
+    # The Fireworks SDK manages its own connection pool
+    return ChatFireworks(model=model.value, **kwargs)
+
+
+_BUILDERS = {
+    "openai": _build_openai,
+    "anthropic": _build_anthropic,
+    "fireworks": _build_fireworks,
+}
+
+
+def get_chat_model(model: Enum, **kwargs):
+    """
+    Return a shared chat model for the given model enum and settings.
+    
+    Models with the same settings are built once per process and all models of
+    a provider share that provider's pooled httpx clients.
+    """
+    key = (model, tuple(sorted(kwargs.items())))
+    
+    with _lock:
+        if key in _chat_models:
+            return _chat_models[key]
+    
+    llm = _BUILDERS[provider_for(model)](model, **kwargs)
+    
+    with _lock:
+        return _chat_models.setdefault(key, llm)
+
+
+def get_embedding_model(model: OpenAIModel):
+    """Return a shared OpenAI embeddings client on the pooled openai httpx clients."""
+    from langchain_openai import OpenAIEmbeddings
+    
+    key = ("embeddings", model)
+    
+    with _lock:
+        if key in _chat_models:
+            return _chat_models[key]
+    
+    embeddings = OpenAIEmbeddings(
+        model=model.value,
+        http_client=get_http_client("openai"),
+        http_async_client=get_async_http_client("openai"),
+        # Inputs are short topics: send the text as is instead of tiktoken chunks
+        check_embedding_ctx_length=False,
+    )
+    
+    with _lock:
+        return _chat_models.setdefault(key, embeddings)
+
+
+# Where each provider's SDK sends requests, for opening pooled connections early
+_BASE_URLS = {
+    "openai": lambda: os.getenv("OPENAI_API_BASE") or "https://api.openai.com/v1",
+    "anthropic": lambda: os.getenv("ANTHROPIC_API_URL") or "https://api.anthropic.com",
+}
+
+
+async def warm_connections(connections: int = 2, timeout: float = 5.0) -> Dict[str, int]:
+    """
+    Open `connections` pooled keep-alive connections (TCP + TLS) to every
+    provider whose async client exists, so the first LLM calls skip the
+    handshakes. Any HTTP status counts as warm; returns how many opened per provider.
+    """
+    with _lock:
+        clients = {provider: client for provider, client in _async_clients.items() if provider in _BASE_URLS}
+    
+    async def touch(client: httpx.AsyncClient, url: str) -> bool:
+        try:
+            await client.get(url, timeout=timeout)
+            return True
+        except httpx.HTTPError:
+            return False
+    
+    warmed = {}
+    for provider, client in clients.items():
+        url = f"{_BASE_URLS[provider]().rstrip('/')}/models"
+        results = await asyncio.gather(*(touch(client, url) for _ in range(connections)))
+        warmed[provider] = sum(results)
+    return warmed
+
+
+async def aclose_clients():
+    """Close every pooled client. Called from the FastAPI shutdown hook."""
+    with _lock:
+        sync_clients = list(_sync_clients.values())
+        async_clients = list(_async_clients.values())
+        _sync_clients.clear()
+        _async_clients.clear()
+        _chat_models.clear()
+    
+    for client in async_clients:
+        await client.aclose()
+    for client in sync_clients:
+        client.close()
@@ -13,3 +13,8 @@ class AnthropicModel(Enum):
     CLAUDE_3_OPUS_20240229 = "claude-3-opus-20240229"
     CLAUDE_3_SONNET_20240229 = "claude-3-sonnet-20240229"
     CLAUDE_3_HAIKU_20240307 = "claude-3-haiku-20240307"
+    CLAUDE_3_5_SONNET_LATEST = "claude-3-5-sonnet-latest"
+
+class FireworksModel(Enum):
+    LLAMA_V3P1_8B_INSTRUCT = "accounts/fireworks/models/llama-v3p1-8b-instruct"
+    LLAMA_V3P1_70B_INSTRUCT = "accounts/fireworks/models/llama-v3p1-70b-instruct"
@@ -1,5 +1,9 @@
 from langchain.prompts import PromptTemplate
 
+from .prompt_format import prompt_style
+
+PROMPT_VERSION = "2"
+
 def CONTENT_STRATEGIST_PROMPT(format_instructions):
     prompt_template = """
     You are a Twitter Content Strategist. Keep it simple and direct.
@@ -16,12 +20,17 @@ def CONTENT_STRATEGIST_PROMPT(format_instructions):
     {format_instructions}
     """
     
+    # Static instructions first, the topic last: the prefix is shared by every call
+    compact_template = """You are a Twitter Content Strategist. Keep it simple and direct.
+Provide the main topic (one sentence), the target audience (one sentence) and three different content angles to explore the topic. Be concise and actionable.
+{format_instructions}
+
+Topic: {topic_context}"""
+    
     PROMPT = PromptTemplate(
-        template=prompt_template,
+        template=compact_template if prompt_style() == "compact" else prompt_template,
         input_variables=["topic_context"],
         partial_variables={"format_instructions": format_instructions}
     )
     
     return PROMPT
-
-
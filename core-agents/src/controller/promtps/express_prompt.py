@@ -0,0 +1,44 @@
+from langchain.prompts import PromptTemplate
+
+from .prompt_format import prompt_style
+
+PROMPT_VERSION = "1"
+
+def EXPRESS_PROMPT(format_instructions):
+    prompt_template = """
+    You are a Twitter Content Strategist, Creator and Optimizer in one. Keep it simple and direct.
+    
+    Topic: {topic_context}
+    
+    First plan silently: the target audience and three different content angles to explore this topic.
+    
+    Then write {tweet_count} tweets (max 280 chars each) spread across those angles:
+    - Start with a strong hook
+    - Provide clear value
+    - Make them engaging and shareable
+    - Mix types: educational, inspirational, entertaining
+    
+    Polish every tweet before answering: stronger hooks, better formatting, clear and concise.
+    
+    Return {tweet_count} polished tweets and one paragraph with key posting tips.
+    
+    {format_instructions}
+    """
+    
+    # Static instructions first, the topic last: the prefix is shared by every call
+    compact_template = """You are a Twitter Content Strategist, Creator and Optimizer in one. Keep it simple and direct.
+First plan silently: the target audience and three different content angles to explore the topic.
+Then write the tweets spread across those angles. Each tweet: max 280 chars, starts with a strong hook, provides clear value, engaging and shareable. Mix types: educational, inspirational, entertaining.
+Polish every tweet before answering: stronger hooks, better formatting, clear and concise. Also give one paragraph with key posting tips.
+{format_instructions}
+
+Topic: {topic_context}
+Return {tweet_count} polished tweets."""
+    
+    PROMPT = PromptTemplate(
+        template=compact_template if prompt_style() == "compact" else prompt_template,
+        input_variables=["topic_context", "tweet_count"],
+        partial_variables={"format_instructions": format_instructions}
+    )
+    
+    return PROMPT
@@ -0,0 +1,72 @@
+import json
+import os
+import typing
+from typing import Any, Callable, Union
+
+from langchain_core.output_parsers import JsonOutputParser
+
+
+def prompt_style() -> str:
+    """
+    PROMPT_STYLE=compact (default): minified state, one-line output schemas and
+    the variable content at the end of every prompt, so the static prefix is
+    identical across calls (provider-side prompt caching).
+    PROMPT_STYLE=verbose: the original indented JSON and pydantic instructions.
+    """
+    return "verbose" if os.getenv("PROMPT_STYLE", "compact") == "verbose" else "compact"
+
+
+def structured_output_mode() -> str:
+    """
+    STRUCTURED_OUTPUT=json_schema (default) or function_calling: the output
+    schema goes to the provider natively and the prompt carries no format
+    instructions. STRUCTURED_OUTPUT=prompt: format instructions in the prompt.
+    """
+    mode = os.getenv("STRUCTURED_OUTPUT", "json_schema")
+    return mode if mode in ("json_schema", "function_calling", "prompt") else "json_schema"
+
+
+def serialize_state(value: Any) -> str:
+    """JSON for state passed into a prompt (strategy, tweets)."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if prompt_style() == "verbose":
+        return json.dumps(value, indent=2)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _fields(model) -> dict:
+    # Works for pydantic v2 models and langchain_core.pydantic_v1 models
+    fields = getattr(model, "model_fields", None)
+    if fields is None:
+        return {name: (field.annotation, field.field_info.description) for name, field in model.__fields__.items()}
+    return {name: (field.annotation, field.description) for name, field in fields.items()}
+
+
+def _skeleton(annotation, description) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin in (list, typing.List):
+        (item,) = typing.get_args(annotation)
+        return [_skeleton(item, description)]
+    if isinstance(annotation, type) and (hasattr(annotation, "model_fields") or hasattr(annotation, "__fields__")):
+        return {name: _skeleton(*field) for name, field in _fields(annotation).items()}
+    return description or annotation.__name__
+
+
+def compact_format_instructions(model) -> str:
+    """
+    One-line JSON skeleton of the output model with field descriptions as
+    values, instead of the full JSON schema and its boilerplate.
+    """
+    skeleton = {name: _skeleton(*field) for name, field in _fields(model).items()}
+    return "Reply with JSON only, shaped like: " + json.dumps(skeleton, separators=(",", ":"))
+
+
+def format_instructions(model) -> Union[str, Callable[[], str]]:
+    """Format instructions for the current prompt style and structured output mode."""
+    if structured_output_mode() != "prompt":
+        # The provider gets the schema itself
+        return ""
+    if prompt_style() == "verbose":
+        return JsonOutputParser(pydantic_object=model).get_format_instructions
+    return compact_format_instructions(model)
@@ -1,5 +1,9 @@
 from langchain.prompts import PromptTemplate
 
+from .prompt_format import prompt_style
+
+PROMPT_VERSION = "3"
+
 def QUALITY_OPTIMIZER_PROMPT(format_instructions):
     prompt_template = """
     You are a Twitter Optimizer. Polish these tweets and make them better.
@@ -8,23 +12,30 @@ def QUALITY_OPTIMIZER_PROMPT(format_instructions):
     
     Topic: {topic_context}
     
-    Improve each tweet:
+    Improve each tweet, fixing the issues listed with it:
     - Stronger hooks
     - Better formatting
     - More engaging
     - Clear and concise
     
-    Return 5 polished tweets and one paragraph with key posting tips.
+    Return {tweet_count} polished tweets, in the same order, and one paragraph with key posting tips.
     
     {format_instructions}
     """
     
+    # Static instructions first, topic and tweets last: the prefix is shared by every call
+    compact_template = """You are a Twitter Optimizer. Polish the tweets below and make them better.
+Improve each tweet and fix the issues listed with it: stronger hooks, better formatting, more engaging, clear and concise.
+Return one polished tweet per tweet given, in the same order, and one paragraph with key posting tips.
+{format_instructions}
+
+Topic: {topic_context}
+Tweets to optimize: {generated_tweets}"""
+    
     PROMPT = PromptTemplate(
-        template=prompt_template,
-        input_variables=["generated_tweets", "topic_context"],
+        template=compact_template if prompt_style() == "compact" else prompt_template,
+        input_variables=["generated_tweets", "tweet_count", "topic_context"],
         partial_variables={"format_instructions": format_instructions}
     )
     
     return PROMPT
-
-
@@ -1,13 +1,18 @@
 from langchain.prompts import PromptTemplate
 
+from .prompt_format import prompt_style
+
+PROMPT_VERSION = "3"
+
 def TWEET_CREATOR_PROMPT(format_instructions):
     prompt_template = """
-    You are a Twitter Content Creator. Create 5 engaging tweets.
+    You are a Twitter Content Creator. Create {tweet_count} engaging tweets for one content angle.
     
     Strategy: {weekly_strategy}
     Topic: {topic_context}
+    Content angle: {content_angle}
     
-    Generate 5 tweets (max 280 chars each):
+    Generate {tweet_count} tweets (max 280 chars each) for this angle only:
     - Start with a strong hook
     - Provide clear value
     - Make them engaging and shareable
@@ -18,12 +23,20 @@ def TWEET_CREATOR_PROMPT(format_instructions):
     {format_instructions}
     """
     
+    # Static instructions first, strategy/angle/count last: the prefix is shared by every call
+    compact_template = """You are a Twitter Content Creator. Write engaging tweets for one content angle of a weekly strategy.
+Each tweet: max 280 chars, starts with a strong hook, provides clear value, engaging and shareable. Mix types: educational, inspirational, entertaining. Keep it punchy and direct.
+{format_instructions}
+
+Strategy: {weekly_strategy}
+Topic: {topic_context}
+Content angle: {content_angle}
+Create {tweet_count} tweets for this angle only."""
+    
     PROMPT = PromptTemplate(
-        template=prompt_template,
-        input_variables=["weekly_strategy", "topic_context"],
+        template=compact_template if prompt_style() == "compact" else prompt_template,
+        input_variables=["weekly_strategy", "topic_context", "content_angle", "tweet_count"],
         partial_variables={"format_instructions": format_instructions}
     )
     
     return PROMPT
-
-
@@ -0,0 +1,49 @@
+from langchain.prompts import PromptTemplate
+
+from .prompt_format import prompt_style
+
+PROMPT_VERSION = "1"
+
+def TWEET_REGENERATOR_PROMPT(format_instructions):
+    prompt_template = """
+    You are a Twitter Content Creator and Optimizer. An editor rejected one tweet of a weekly plan; write its replacement.
+    
+    Strategy: {weekly_strategy}
+    Topic: {topic_context}
+    
+    The other tweets of the week (keep them, do not repeat their ideas):
+    {other_tweets}
+    
+    Rejected tweet: {rejected_tweet}
+    Editor feedback: {feedback}
+    
+    Write one new {content_type} tweet (max 280 chars) for the same slot:
+    - Start with a strong hook
+    - Provide clear value
+    - Make it engaging and shareable
+    - Say something different from the rejected tweet and from the other tweets
+    
+    Polish it before answering: stronger hook, better formatting, clear and concise.
+    
+    {format_instructions}
+    """
+    
+    # Static instructions first, the week's content last: the prefix is shared by every call
+    compact_template = """You are a Twitter Content Creator and Optimizer. An editor rejected one tweet of a weekly plan; write its replacement for the same slot.
+The tweet: max 280 chars, starts with a strong hook, provides clear value, engaging and shareable, polished (stronger hook, better formatting, clear and concise). It must say something different from the rejected tweet and not repeat the ideas of the other tweets.
+{format_instructions}
+
+Strategy: {weekly_strategy}
+Topic: {topic_context}
+Other tweets: {other_tweets}
+Rejected tweet: {rejected_tweet}
+Editor feedback: {feedback}
+Write one new {content_type} tweet."""
+    
+    PROMPT = PromptTemplate(
+        template=compact_template if prompt_style() == "compact" else prompt_template,
+        input_variables=["weekly_strategy", "topic_context", "other_tweets", "rejected_tweet", "feedback", "content_type"],
+        partial_variables={"format_instructions": format_instructions}
+    )
+    
+    return PROMPT
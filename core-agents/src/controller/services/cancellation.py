@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Deque, Dict, Iterator
+
+from prometheus_client import Counter
+from starlette.requests import Request
+
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+CANCELLED_RUNS = Counter(
+    "supervisor_runs_cancelled_total",
+    "Pipeline runs stopped because every client waiting on them went away",
+    ["mode"],
+)
+TOKENS_SPENT_BEFORE_CANCEL = Counter(
+    "supervisor_cancelled_tokens_spent_total",
+    "Tokens already spent by runs that were later cancelled",
+    ["mode"],
+)
+TOKENS_SAVED_BY_CANCEL = Counter(
+    "supervisor_cancelled_tokens_saved_total",
+    "Estimated tokens not spent thanks to cancellation (average full run minus tokens spent)",
+    ["mode"],
+)
+
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away before the response was ready."""
+
+
+class RunCosts:
+    """Rolling token cost of completed runs, used to estimate what a cancellation saved."""
+    
+    def __init__(self, window: int = 100):
+        self._lock = threading.Lock()
+        self._totals: Deque[int] = deque(maxlen=window)
+    
+    def completed(self, tokens: int) -> None:
+        with self._lock:
+            self._totals.append(tokens)
+    
+    def cancelled(self, mode: str, tokens: int) -> None:
+        with self._lock:
+            average = sum(self._totals) / len(self._totals) if self._totals else 0
+        saved = max(0, average - tokens)
+        
+        CANCELLED_RUNS.labels(mode).inc()
+        TOKENS_SPENT_BEFORE_CANCEL.labels(mode).inc(tokens)
+        TOKENS_SAVED_BY_CANCEL.labels(mode).inc(saved)
+        logger.info("run cancelled", extra={"mode": mode, "tokens": tokens, "tokens_saved": saved})
+
+
+_run_costs = RunCosts()
+
+
+@contextmanager
+def track_run_cost(mode: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a graph config that counts the run's tokens, and record the run as
+    completed or cancelled (task cancelled or its stream closed) on exit.
+    """
+    # Imported here so the routes can import this module without langchain
+    from src.callbacks.token_usage import attach_token_usage
+    
+    config, usage = attach_token_usage(None)
+    try:
+        yield config
+    except (asyncio.CancelledError, GeneratorExit):
+        _run_costs.cancelled(mode, usage.total_tokens)
+        raise
+    else:
+        _run_costs.completed(usage.total_tokens)
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[Any], poll_interval: float = 0.25) -> Any:
+    """
+    Await `awaitable` while polling the client connection; if the client
+    disconnects first, cancel it and raise ClientDisconnected.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("client disconnected, cancelling request")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List
+
+
+class EventChannel:
+    """
+    Append-only log of pipeline events with any number of subscribers.
+    
+    Subscribers that attach late first replay every event published so far,
+    then follow live events until the channel is closed.
+    """
+    
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.closed = False
+        self._condition = asyncio.Condition()
+    
+    async def publish(self, event: Dict[str, Any]) -> None:
+        async with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+    
+    async def close(self) -> None:
+        async with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+    
+    async def subscribe(self) -> AsyncGenerator[Dict[str, Any], None]:
+        position = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: position < len(self.events) or self.closed
+                )
+                pending = self.events[position:]
+                position = len(self.events)
+                done = self.closed
+            
+            for event in pending:
+                yield event
+            
+            if done and position == len(self.events):
+                return
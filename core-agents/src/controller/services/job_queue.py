@@ -0,0 +1,188 @@
+import asyncio
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.controller.services.event_channel import EventChannel
+from src.controller.services.metrics import JOB_QUEUE_WAIT, track_in_flight
+from src.controller.services.structured_logging import get_logger, request_id_var
+
+logger = get_logger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its max depth."""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    id: str
+    topic_context: str
+    incremental: bool = False
+    mode: str = "full"
+    status: str = "queued"  # queued | running | completed | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    channel: EventChannel = field(default_factory=EventChannel)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "topic_context": self.topic_context,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs supervisor_agent_stream jobs on a fixed pool of worker tasks.
+    
+    The queue has a max depth so bursts are shed with QueueFullError instead of
+    piling up, and finished jobs are dropped after the retention time.
+    """
+    
+    def __init__(self, workers: int, max_queue_depth: int, retention_seconds: int):
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._durations: List[float] = []
+    
+    @classmethod
+    def from_env(cls) -> "JobManager":
+        return cls(
+            workers=_env_int("JOB_WORKERS", 4),
+            max_queue_depth=_env_int("JOB_MAX_QUEUE_DEPTH", 100),
+            retention_seconds=_env_int("JOB_RETENTION_SECONDS", 60 * 60),
+        )
+    
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._purge_loop(), name="job-purge"))
+    
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up, from recent job durations."""
+        if not self._durations:
+            return 5
+        average = sum(self._durations) / len(self._durations)
+        return max(1, math.ceil(average * self._queue.qsize() / self.workers))
+    
+    def submit(self, topic_context: str, incremental: bool = False, mode: str = "full") -> Job:
+        job = Job(id=uuid.uuid4().hex, topic_context=topic_context, incremental=incremental, mode=mode)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after())
+        
+        self.jobs[job.id] = job
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "jobs": statuses,
+        }
+    
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+    
+    async def _run(self, job: Job) -> None:
+        # The pipeline modules are heavy, keep them out of app import time
+        from src.controller.agents.supervisor_agent import supervisor_agent_stream
+        from src.controller.services.rate_limiter import llm_priority_var
+        
+        job.status = "running"
+        job.started_at = time.time()
+        JOB_QUEUE_WAIT.observe(job.started_at - job.created_at)
+        # Logs and LLM calls of the run carry the job id and the background
+        # priority, reset afterwards so they do not stick to the worker task
+        request_token = request_id_var.set(job.id)
+        priority_token = llm_priority_var.set("background")
+        
+        try:
+            with track_in_flight("supervisor_agent_job"):
+                async for event in supervisor_agent_stream(job.topic_context, job.incremental, job.mode):
+                    if event["event"] == "final_result":
+                        job.result = event["data"]
+                    elif event["event"] == "error":
+                        job.error = event["message"]
+                    await job.channel.publish(event)
+        except Exception as e:
+            logger.exception("job failed")
+            job.error = str(e)
+            await job.channel.publish({"event": "error", "message": str(e)})
+        finally:
+            job.status = "failed" if job.error or job.result is None else "completed"
+            job.finished_at = time.time()
+            await job.channel.close()
+            
+            self._durations = (self._durations + [job.finished_at - job.started_at])[-50:]
+            llm_priority_var.reset(priority_token)
+            request_id_var.reset(request_token)
+    
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(60, self.retention_seconds))
+            cutoff = time.time() - self.retention_seconds
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager.from_env()
+    return _job_manager
@@ -0,0 +1,251 @@
+import functools
+import inspect
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+NODE_LATENCY = Histogram(
+    "agent_node_latency_seconds",
+    "Wall-clock time of one graph node run",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "agent_node_errors_total",
+    "Graph node runs that raised",
+    ["node"],
+)
+PARSE_FAILURES = Counter(
+    "agent_parse_failures_total",
+    "LLM outputs the node could not parse",
+    ["node"],
+)
+PARSE_REPAIRS = Counter(
+    "agent_parse_repairs_total",
+    "LLM outputs that only validated after local repair (no LLM retry)",
+    ["schema"],
+)
+VALIDATOR_ROUTES = Counter(
+    "tweet_validator_routes_total",
+    "Runs by route after local validation: skip (no optimizer), partial (failing tweets only) or full",
+    ["route"],
+)
+VALIDATOR_ISSUES = Counter(
+    "tweet_validator_issues_total",
+    "Issues found by the local tweet validator",
+    ["issue"],
+)
+LLM_LATENCY = Histogram(
+    "llm_call_latency_seconds",
+    "Time from sending an LLM call to its last token",
+    ["model", "node"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending an LLM call to its first token (whole response when not streaming)",
+    ["model", "node"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Prompt tokens per LLM call",
+    ["model", "node"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens",
+    "Completion tokens per LLM call",
+    ["model", "node"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_ERRORS = Counter(
+    "llm_call_errors_total",
+    "LLM calls that raised",
+    ["model", "node"],
+)
+IN_FLIGHT = Gauge(
+    "supervisor_requests_in_flight",
+    "Requests currently being served",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+JOB_QUEUE_WAIT = Histogram(
+    "job_queue_wait_seconds",
+    "Time a job spent queued before a worker picked it up",
+    buckets=LATENCY_BUCKETS,
+)
+
+SANDBOX_RUNS = Counter(
+    "python_sandbox_runs_total",
+    "python_repl_tool snippets by outcome (ok, error, timeout, cpu_limit, memory_limit, crashed, busy)",
+    ["status"],
+)
+SANDBOX_DURATION = Histogram(
+    "python_sandbox_run_seconds",
+    "Wall-clock time of one sandboxed snippet, including the wait for a free worker",
+    buckets=LATENCY_BUCKETS,
+)
+SANDBOX_WORKERS = Gauge(
+    "python_sandbox_workers",
+    "Live sandbox worker processes",
+    multiprocess_mode="livesum",
+)
+SANDBOX_WORKERS_BUSY = Gauge(
+    "python_sandbox_workers_busy",
+    "Sandbox workers currently running a snippet",
+    multiprocess_mode="livesum",
+)
+SANDBOX_RECYCLES = Counter(
+    "python_sandbox_worker_recycles_total",
+    "Sandbox workers replaced, by reason (max_tasks, timeout, cpu_limit, memory_limit, crashed)",
+    ["reason"],
+)
+ROUTER_DECISIONS = Counter(
+    "supervisor_router_decisions_total",
+    "Supervisor hops by decision source (rules, llm, cache) and next worker",
+    ["source", "next"],
+)
+ROUTER_LATENCY = Histogram(
+    "supervisor_router_latency_seconds",
+    "Time to pick the next supervisor hop, by decision source",
+    ["source"],
+    buckets=(0.0005, 0.001, 0.005, 0.01) + LATENCY_BUCKETS,
+)
+WEB_SEARCH_LOOKUPS = Counter(
+    "web_search_lookups_total",
+    "Researcher web searches by backend and where they were answered (cache_hit, backend)",
+    ["backend", "result"],
+)
+WEB_SEARCH_LATENCY = Histogram(
+    "web_search_backend_latency_seconds",
+    "Time of one search backend call",
+    ["backend"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def instrument_node(node_name: str):
+    """
+    Decorator for graph node functions (sync or async): records latency, errors
+    and parse failures. Keeps the wrapped signature so RunnableLambda still
+    passes config.
+    """
+    def decorator(func: Callable) -> Callable:
+        @contextmanager
+        def observe():
+            start = time.perf_counter()
+            try:
+                yield
+            except Exception as e:
+                # Nodes only run once langchain is loaded, the import is free here
+                from langchain_core.exceptions import OutputParserException
+                
+                if isinstance(e, OutputParserException):
+                    PARSE_FAILURES.labels(node_name).inc()
+                NODE_ERRORS.labels(node_name).inc()
+                raise
+            finally:
+                NODE_LATENCY.labels(node_name).observe(time.perf_counter() - start)
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with observe():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with observe():
+                return func(*args, **kwargs)
+        return wrapper
+    
+    return decorator
+
+
+@contextmanager
+def track_in_flight(endpoint: str):
+    IN_FLIGHT.labels(endpoint).inc()
+    try:
+        yield
+    finally:
+        IN_FLIGHT.labels(endpoint).dec()
+
+
+class StatsCollector:
+    """
+    Exposes the stats dicts kept by the caches, single-flight and job queue
+    as gauges at scrape time.
+    """
+    
+    def __init__(self, sources: Dict[str, Callable[[], Dict[str, Any]]]):
+        self.sources = sources
+    
+    def describe(self):
+        # Without describe() REGISTRY.register calls collect(), which would
+        # build every stats source (and the pipeline) at import time
+        return []
+    
+    def collect(self):
+        for prefix, source in self.sources.items():
+            try:
+                stats = source()
+            except Exception:
+                continue
+            for name, value in _flatten(stats).items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield GaugeMetricFamily(f"{prefix}_{name}", f"{prefix} {name}", value=value)
+
+
+def _flatten(stats: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in (stats or {}).items():
+        # Keys can be model names ("gpt-4o-mini"), which are not valid in metric names
+        name = f"{prefix}{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}_"))
+        else:
+            flat[name] = value
+    return flat
+
+
+_stats_collectors = []
+
+
+def register_stats(sources: Dict[str, Callable[[], Dict[str, Any]]]) -> None:
+    collector = StatsCollector(sources)
+    _stats_collectors.append(collector)
+    REGISTRY.register(collector)
+
+
+def render_metrics():
+    """Prometheus text for this process, or all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # The stats dicts live in each worker, these gauges are for the worker serving the scrape
+        for collector in _stats_collectors:
+            registry.register(collector)
+    
+    return generate_latest(registry), CONTENT_TYPE_LATEST
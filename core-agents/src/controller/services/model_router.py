@@ -0,0 +1,364 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+from langchain_core.runnables import Runnable, RunnableConfig
+from prometheus_client import Counter, Gauge
+
+from src.callbacks.token_usage import MODEL_ANSWERED_EVENT
+from src.controller.constants.ai_models import OpenAIModel, AnthropicModel, FireworksModel
+from src.controller.clients.llm_clients import get_chat_model, provider_for
+from src.controller.services.rate_limiter import rate_limited, rate_limit_enabled
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+PROVIDER_ENUMS = {
+    "openai": OpenAIModel,
+    "anthropic": AnthropicModel,
+    "fireworks": FireworksModel,
+}
+
+HEDGES_SENT = Counter(
+    "llm_hedged_requests_total",
+    "Duplicate requests sent because the primary model was slower than its p95",
+    ["agent"],
+)
+HEDGE_WINS = Counter(
+    "llm_hedge_wins_total",
+    "Which model answered first once a hedge was sent",
+    ["agent", "model"],
+)
+FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Calls retried on the fallback model after the primary failed",
+    ["agent"],
+)
+MODEL_P95 = Gauge(
+    "llm_model_latency_p95_seconds",
+    "Rolling p95 latency per model used for hedging",
+    ["model"],
+    multiprocess_mode="max",
+)
+MODEL_ERROR_RATE = Gauge(
+    "llm_model_error_rate",
+    "Rolling error rate per model used for routing",
+    ["model"],
+    multiprocess_mode="max",
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def parse_model_spec(spec: str) -> Enum:
+    """"openai:gpt-4o-mini" -> OpenAIModel.GPT_4_OMNI_MINI"""
+    provider, _, value = spec.partition(":")
+    try:
+        return PROVIDER_ENUMS[provider](value)
+    except (KeyError, ValueError):
+        raise ValueError(f"Unknown model spec {spec!r}, expected <provider>:<model>")
+
+
+def model_spec(model: Enum) -> str:
+    return f"{provider_for(model)}:{model.value}"
+
+
+class ModelStats:
+    """Rolling latency and error window for one model."""
+    
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+    
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        with self._lock:
+            if ok and latency is not None:
+                self.latencies.append(latency)
+            self.outcomes.append(ok)
+    
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+    
+    def samples(self) -> int:
+        return len(self.latencies)
+
+
+_stats: Dict[str, ModelStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_model_stats(model_name: str) -> ModelStats:
+    with _stats_lock:
+        if model_name not in _stats:
+            _stats[model_name] = ModelStats()
+        return _stats[model_name]
+
+
+def _record(model_name: str, latency: Optional[float], ok: bool) -> None:
+    stats = get_model_stats(model_name)
+    stats.record(latency, ok)
+    p95 = stats.p95()
+    if p95 is not None:
+        MODEL_P95.labels(model_name).set(p95)
+    MODEL_ERROR_RATE.labels(model_name).set(stats.error_rate())
+
+
+@dataclass
+class HedgeSettings:
+    min_delay: float = 0.5
+    cold_delay: float = 8.0
+    min_samples: int = 20
+    max_error_rate: float = 0.5
+    
+    @classmethod
+    def from_env(cls) -> "HedgeSettings":
+        return cls(
+            min_delay=_env_float("HEDGE_MIN_DELAY_S", cls.min_delay),
+            cold_delay=_env_float("HEDGE_COLD_DELAY_S", cls.cold_delay),
+            min_samples=int(_env_float("HEDGE_MIN_SAMPLES", cls.min_samples)),
+            max_error_rate=_env_float("ROUTER_MAX_ERROR_RATE", cls.max_error_rate),
+        )
+
+
+class HedgedChatModel(Runnable):
+    """
+    Chat model stand-in for `prompt | llm | parser` that routes each call over a
+    primary and an optional fallback model.
+    
+    - The healthier model goes first: the fallback leads when the primary's
+      rolling error rate is too high or its p95 is clearly worse.
+    - If the leader has not answered by its rolling p95, a hedged duplicate goes
+      to the other model; the first answer wins and the loser is cancelled.
+    - If the leader fails, the call is retried on the other model.
+    
+    Streaming and the sync path have no hedging, only the fallback on errors
+    raised before the first chunk.
+    
+    The candidate that answered is reported to the run's callbacks as a
+    MODEL_ANSWERED_EVENT custom event, so responses name the right model.
+    """
+    
+    def __init__(self, agent: str, candidates: List[Tuple[str, Runnable]], settings: HedgeSettings):
+        self.agent = agent
+        self.candidates = candidates
+        self.settings = settings
+    
+    @property
+    def model_names(self) -> List[str]:
+        return [name for name, _ in self.candidates]
+    
+    def _ordered(self) -> List[Tuple[str, Runnable]]:
+        if len(self.candidates) < 2:
+            return self.candidates
+        
+        (primary_name, _), (fallback_name, _) = self.candidates[:2]
+        primary, fallback = get_model_stats(primary_name), get_model_stats(fallback_name)
+        
+        primary_unhealthy = (
+            primary.error_rate() > self.settings.max_error_rate
+            and fallback.error_rate() <= self.settings.max_error_rate
+        )
+        primary_slower = (
+            primary.samples() >= self.settings.min_samples
+            and fallback.samples() >= self.settings.min_samples
+            and primary.p95() > 1.5 * fallback.p95()
+        )
+        if primary_unhealthy or primary_slower:
+            logger.info("routing to fallback first", extra={"agent": self.agent, "model": fallback_name})
+            return [self.candidates[1], self.candidates[0]]
+        return self.candidates
+    
+    def _hedge_delay(self, model_name: str) -> float:
+        stats = get_model_stats(model_name)
+        if stats.samples() < self.settings.min_samples:
+            return self.settings.cold_delay
+        return max(self.settings.min_delay, stats.p95())
+    
+    def _answered(self, name: str, config: Optional[RunnableConfig]) -> None:
+        try:
+            dispatch_custom_event(MODEL_ANSWERED_EVENT, {"agent": self.agent, "model": name}, config=config)
+        except RuntimeError:
+            # Called outside of a run: no callbacks to tell
+            pass
+    
+    async def _aanswered(self, name: str, config: Optional[RunnableConfig]) -> None:
+        try:
+            await adispatch_custom_event(MODEL_ANSWERED_EVENT, {"agent": self.agent, "model": name}, config=config)
+        except RuntimeError:
+            pass
+    
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        ordered = self._ordered()
+        for position, (name, model) in enumerate(ordered):
+            start = time.perf_counter()
+            try:
+                result = model.invoke(input, config, **kwargs)
+            except Exception:
+                _record(name, None, False)
+                if position == len(ordered) - 1:
+                    raise
+                FALLBACKS.labels(self.agent).inc()
+                logger.warning("model failed, using fallback", extra={"agent": self.agent, "model": name})
+                continue
+            _record(name, time.perf_counter() - start, True)
+            self._answered(name, config)
+            return result
+    
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        ordered = self._ordered()
+        for position, (name, model) in enumerate(ordered):
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in model.stream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception:
+                _record(name, None, False)
+                if started or position == len(ordered) - 1:
+                    raise
+                FALLBACKS.labels(self.agent).inc()
+                logger.warning("model failed, using fallback", extra={"agent": self.agent, "model": name})
+                continue
+            _record(name, time.perf_counter() - start, True)
+            self._answered(name, config)
+            return
+    
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        ordered = self._ordered()
+        for position, (name, model) in enumerate(ordered):
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in model.astream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception:
+                _record(name, None, False)
+                if started or position == len(ordered) - 1:
+                    raise
+                FALLBACKS.labels(self.agent).inc()
+                logger.warning("model failed, using fallback", extra={"agent": self.agent, "model": name})
+                continue
+            _record(name, time.perf_counter() - start, True)
+            await self._aanswered(name, config)
+            return
+    
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        ordered = self._ordered()
+        leader_name, leader = ordered[0]
+        
+        async def call(name, model):
+            start = time.perf_counter()
+            try:
+                result = await model.ainvoke(input, config, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _record(name, None, False)
+                raise
+            _record(name, time.perf_counter() - start, True)
+            return name, result
+        
+        # Every task started here is cancelled on the way out, including when
+        # the caller itself is cancelled (client disconnect, last waiter gone)
+        tasks = set()
+        
+        def start(name, model):
+            task = asyncio.ensure_future(call(name, model))
+            tasks.add(task)
+            return task
+        
+        try:
+            leader_task = start(leader_name, leader)
+            if len(ordered) < 2:
+                name, result = await leader_task
+                await self._aanswered(name, config)
+                return result
+            
+            backup_name, backup = ordered[1]
+            done, _ = await asyncio.wait({leader_task}, timeout=self._hedge_delay(leader_name))
+            
+            if done:
+                try:
+                    name, result = leader_task.result()
+                except Exception:
+                    FALLBACKS.labels(self.agent).inc()
+                    logger.warning("model failed, using fallback", extra={"agent": self.agent, "model": leader_name})
+                    name, result = await start(backup_name, backup)
+                await self._aanswered(name, config)
+                return result
+            
+            # Leader is slower than its p95: race a duplicate on the other model
+            HEDGES_SENT.labels(self.agent).inc()
+            pending = {leader_task, start(backup_name, backup)}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        name, result = task.result()
+                        HEDGE_WINS.labels(self.agent, name).inc()
+                        await self._aanswered(name, config)
+                        return result
+            # Both failed
+            raise leader_task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def build_agent_model(
+    agent: str,
+    default: Enum,
+    bind: Optional[Callable[[Runnable, str], Runnable]] = None,
+    **kwargs
+) -> HedgedChatModel:
+    """
+    Build the routed model of one agent from <AGENT>_MODEL and
+    <AGENT>_FALLBACK_MODEL, e.g. CONTENT_STRATEGIST_FALLBACK_MODEL=anthropic:claude-3-haiku-20240307.
+    `bind(chat_model, provider)` is applied to each candidate, e.g. to attach
+    the agent's output schema in the form that provider supports.
+    """
+    prefix = agent.upper()
+    primary = parse_model_spec(os.getenv(f"{prefix}_MODEL", model_spec(default)))
+    specs = [primary]
+    
+    fallback = os.getenv(f"{prefix}_FALLBACK_MODEL")
+    if fallback:
+        specs.append(parse_model_spec(fallback))
+    
+    candidates = []
+    for model in specs:
+        model_kwargs = dict(kwargs)
+        if provider_for(model) != "openai":
+            model_kwargs.pop("stream_usage", None)
+        elif rate_limit_enabled():
+            # x-ratelimit-* headers keep the shared budget in line with OpenAI's
+            model_kwargs["include_response_headers"] = True
+        llm = get_chat_model(model, **model_kwargs)
+        if bind is not None:
+            llm = bind(llm, provider_for(model))
+        candidates.append((model.value, rate_limited(model.value, llm)))
+    
+    return HedgedChatModel(agent, candidates, HedgeSettings.from_env())
@@ -0,0 +1,488 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from prometheus_client import Counter, Histogram
+
+from src.controller.cache.result_cache import cache_dir
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Lower value is served first when calls queue for the same model
+PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+
+# Set by entry points (batch endpoint, job workers); inherited by graph tasks
+llm_priority_var: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="interactive")
+
+RATE_LIMIT_WAIT = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time a call waited for request/token budget before being sent",
+    ["model", "priority"],
+    buckets=(0.005, 0.05, 0.25, 1, 2.5, 5, 10, 30, 60),
+)
+RATE_LIMITED = Counter(
+    "llm_rate_limited_total",
+    "429 responses returned by the provider despite the limiter",
+    ["model"],
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_suffix(model_name: str) -> str:
+    """"gpt-4o-mini" -> "GPT_4O_MINI" for per-model env overrides"""
+    return re.sub(r"[^A-Z0-9]+", "_", model_name.rsplit("/", 1)[-1].upper()).strip("_")
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse reset/retry headers: "1.5", "20ms", "6m0s", "1h2m3.5s" -> seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def _header_float(headers: Dict[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+def read_limit_headers(headers: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """Normalize OpenAI (x-ratelimit-*) and Anthropic (anthropic-ratelimit-*) limit headers."""
+    headers = {name.lower(): value for name, value in headers.items()}
+    return {
+        "limit_requests": _header_float(headers, "x-ratelimit-limit-requests", "anthropic-ratelimit-requests-limit"),
+        "limit_tokens": _header_float(headers, "x-ratelimit-limit-tokens", "anthropic-ratelimit-tokens-limit"),
+        "remaining_requests": _header_float(headers, "x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining"),
+        "remaining_tokens": _header_float(headers, "x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining"),
+        "retry_after": (
+            _header_float(headers, "retry-after-ms") / 1000
+            if "retry-after-ms" in headers
+            else parse_reset(headers.get("retry-after"))
+        ),
+        "reset": max(
+            parse_reset(headers.get("x-ratelimit-reset-requests")) or 0,
+            parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0,
+        ) or None,
+    }
+
+
+class BucketStore:
+    """
+    Request and token buckets per model in SQLite, so every uvicorn worker on
+    the host draws from the same per-minute budget. Each acquire is a single
+    IMMEDIATE transaction that refills, checks and debits the bucket.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " model TEXT PRIMARY KEY,"
+            " rpm REAL NOT NULL,"
+            " tpm REAL NOT NULL,"
+            " requests REAL NOT NULL,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " blocked_until REAL NOT NULL DEFAULT 0)"
+        )
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+    
+    def _transaction(self, model: str, rpm: float, tpm: float, pinned: bool, update) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT rpm, tpm, requests, tokens, updated_at, blocked_until FROM buckets WHERE model = ?",
+                (model,)
+            ).fetchone()
+            if row is None:
+                row = (rpm, tpm, rpm, tpm, now, 0.0)
+            
+            # Limits learned from headers persist unless the budget is pinned by env
+            stored_rpm, stored_tpm, requests, tokens, updated_at, blocked_until = row
+            if not pinned:
+                rpm, tpm = stored_rpm, stored_tpm
+            elapsed = max(0.0, now - updated_at)
+            bucket = {
+                "rpm": rpm,
+                "tpm": tpm,
+                "requests": min(rpm, requests + elapsed * rpm / 60),
+                "tokens": min(tpm, tokens + elapsed * tpm / 60),
+                "blocked_until": blocked_until,
+            }
+            
+            result = update(bucket, now)
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (model, rpm, tpm, requests, tokens, updated_at, blocked_until)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, bucket["rpm"], bucket["tpm"], bucket["requests"], bucket["tokens"], now, bucket["blocked_until"])
+            )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def try_acquire(self, model: str, rpm: float, tpm: float, pinned: bool, tokens: float) -> float:
+        """Debit one request and `tokens`; return 0, or the seconds to wait before retrying."""
+        
+        def update(bucket, now):
+            if bucket["blocked_until"] > now:
+                return bucket["blocked_until"] - now
+            
+            # A call bigger than the whole bucket is let through once the bucket is full
+            needed = min(tokens, bucket["tpm"])
+            if bucket["requests"] >= 1 and bucket["tokens"] >= needed:
+                bucket["requests"] -= 1
+                bucket["tokens"] -= needed
+                return 0.0
+            
+            request_wait = (1 - bucket["requests"]) * 60 / bucket["rpm"] if bucket["requests"] < 1 else 0
+            token_wait = (needed - bucket["tokens"]) * 60 / bucket["tpm"] if bucket["tokens"] < needed else 0
+            return max(request_wait, token_wait)
+        
+        return self._transaction(model, rpm, tpm, pinned, update)
+    
+    def refund(self, model: str, rpm: float, tpm: float, pinned: bool, tokens: float, requests: float = 0) -> None:
+        """Give back the part of the token estimate the call did not use, or a whole unused acquire."""
+        
+        def update(bucket, now):
+            bucket["tokens"] = min(bucket["tpm"], bucket["tokens"] + tokens)
+            bucket["requests"] = min(bucket["rpm"], bucket["requests"] + requests)
+        
+        self._transaction(model, rpm, tpm, pinned, update)
+    
+    def observe(self, model: str, rpm: float, tpm: float, pinned: bool, limits: Dict[str, Optional[float]], headroom: float) -> None:
+        """
+        Align the bucket with the provider's view from its limit headers:
+        adopt the real limits (when not pinned by env), never hold more budget
+        than the provider says remains, and block everyone on a retry-after.
+        """
+        
+        def update(bucket, now):
+            if not pinned and limits["limit_requests"]:
+                bucket["rpm"] = limits["limit_requests"] * headroom
+            if not pinned and limits["limit_tokens"]:
+                bucket["tpm"] = limits["limit_tokens"] * headroom
+            if limits["remaining_requests"] is not None:
+                bucket["requests"] = min(bucket["requests"], limits["remaining_requests"] * headroom)
+            if limits["remaining_tokens"] is not None:
+                bucket["tokens"] = min(bucket["tokens"], limits["remaining_tokens"] * headroom)
+            
+            backoff = limits["retry_after"] or limits["reset"]
+            if backoff:
+                bucket["blocked_until"] = max(bucket["blocked_until"], now + backoff)
+        
+        self._transaction(model, rpm, tpm, pinned, update)
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        rows = self._connection().execute(
+            "SELECT model, rpm, tpm, requests, tokens, updated_at, blocked_until FROM buckets"
+        ).fetchall()
+        now = time.time()
+        return {
+            model: {
+                "rpm": rpm,
+                "tpm": tpm,
+                "requests_available": min(rpm, requests + (now - updated_at) * rpm / 60),
+                "tokens_available": min(tpm, tokens + (now - updated_at) * tpm / 60),
+                "blocked_for": max(0.0, blocked_until - now),
+            }
+            for model, rpm, tpm, requests, tokens, updated_at, blocked_until in rows
+        }
+
+
+class ModelRateLimiter:
+    """
+    Per-model scheduler in front of the shared bucket. Waiting calls sit in a
+    priority heap (interactive before batch before background, FIFO within a
+    priority) and only the head of the heap polls the bucket, so a stream of
+    batch calls cannot starve an interactive one.
+    """
+    
+    def __init__(self, model: str, store: BucketStore, rpm: float, tpm: float, pinned: bool, headroom: float):
+        self.model = model
+        self.store = store
+        self.rpm = rpm
+        self.tpm = tpm
+        self.pinned = pinned
+        self.headroom = headroom
+        self._seq = itertools.count()
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._pump: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def acquire(self, tokens: float, priority: str) -> None:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._waiters, self._pump = loop, [], None
+        
+        waiter = loop.create_future()
+        heapq.heappush(self._waiters, (PRIORITIES.get(priority, 0), next(self._seq), tokens, waiter))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run_pump())
+        
+        await waiter
+        RATE_LIMIT_WAIT.labels(self.model, priority).observe(time.perf_counter() - start)
+    
+    async def _run_pump(self) -> None:
+        while self._waiters:
+            _, _, tokens, waiter = self._waiters[0]
+            if waiter.done():
+                # Caller was cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            
+            try:
+                wait = await asyncio.to_thread(self.store.try_acquire, self.model, self.rpm, self.tpm, self.pinned, tokens)
+                if wait <= 0 and waiter.done():
+                    # Cancelled while the bucket was being debited: give the budget back
+                    await asyncio.to_thread(self.store.refund, self.model, self.rpm, self.tpm, self.pinned, tokens, 1)
+            except Exception as e:
+                # e.g. "database is locked" under contention: fail the queued
+                # calls instead of leaving them waiting on a dead pump
+                logger.warning("rate limiter bucket unavailable", extra={"model": self.model, "error": str(e)})
+                waiters, self._waiters = self._waiters, []
+                for *_, queued in waiters:
+                    if not queued.done():
+                        queued.set_exception(e)
+                return
+            
+            if wait <= 0:
+                heapq.heappop(self._waiters)
+                if not waiter.done():
+                    waiter.set_result(None)
+                continue
+            
+            # Re-check at least every second so a new higher-priority call gets in first
+            await asyncio.sleep(min(wait, 1.0))
+    
+    def acquire_sync(self, tokens: float, priority: str) -> None:
+        start = time.perf_counter()
+        while True:
+            wait = self.store.try_acquire(self.model, self.rpm, self.tpm, self.pinned, tokens)
+            if wait <= 0:
+                break
+            time.sleep(min(wait, 1.0))
+        RATE_LIMIT_WAIT.labels(self.model, priority).observe(time.perf_counter() - start)
+    
+    def settle(self, estimated: float, message: Any) -> None:
+        """Refund the unused estimate and sync with the provider's limit headers."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        used = usage.get("total_tokens")
+        if used is not None and used < estimated:
+            self.store.refund(self.model, self.rpm, self.tpm, self.pinned, estimated - used)
+        
+        headers = (getattr(message, "response_metadata", None) or {}).get("headers")
+        if headers:
+            limits = read_limit_headers(headers)
+            # Backoff only comes from 429s, never from a successful response
+            limits["retry_after"] = limits["reset"] = None
+            self.store.observe(self.model, self.rpm, self.tpm, self.pinned, limits, self.headroom)
+    
+    def backoff(self, error: Exception) -> None:
+        """Block the model for every worker for as long as the 429 says."""
+        RATE_LIMITED.labels(self.model).inc()
+        response = getattr(error, "response", None)
+        limits = read_limit_headers(dict(response.headers) if response is not None else {})
+        if not (limits["retry_after"] or limits["reset"]):
+            limits["retry_after"] = 1.0
+        logger.warning(
+            "provider rate limit hit",
+            extra={"model": self.model, "retry_after": limits["retry_after"] or limits["reset"]}
+        )
+        self.store.observe(self.model, self.rpm, self.tpm, self.pinned, limits, self.headroom)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"queued": sum(1 for *_, waiter in self._waiters if not waiter.done())}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def estimate_tokens(input: Any, output_tokens: float) -> float:
+    """Rough prompt size (4 chars per token) plus the expected completion."""
+    text = input.to_string() if hasattr(input, "to_string") else str(input)
+    return len(text) / 4 + output_tokens
+
+
+class RateLimitedChatModel(Runnable):
+    """
+    Wraps a chat model so every call first takes budget from the shared
+    limiter, and a 429 backs everyone off and retries through the limiter.
+    """
+    
+    def __init__(self, llm: Runnable, limiter: ModelRateLimiter, output_tokens: float, retries: int):
+        self.llm = llm
+        self.limiter = limiter
+        self.output_tokens = output_tokens
+        self.retries = retries
+    
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        estimated = estimate_tokens(input, self.output_tokens)
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire_sync(estimated, llm_priority_var.get())
+            try:
+                result = self.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.retries:
+                    raise
+                self.limiter.backoff(e)
+                continue
+            self.limiter.settle(estimated, result)
+            return result
+    
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        estimated = estimate_tokens(input, self.output_tokens)
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire(estimated, llm_priority_var.get())
+            try:
+                result = await self.llm.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.retries:
+                    raise
+                await asyncio.to_thread(self.limiter.backoff, e)
+                continue
+            await asyncio.to_thread(self.limiter.settle, estimated, result)
+            return result
+    
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Iterator[Any]:
+        estimated = estimate_tokens(input, self.output_tokens)
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire_sync(estimated, llm_priority_var.get())
+            final = None
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    final = chunk if final is None else final + chunk
+                    yield chunk
+            except Exception as e:
+                if final is not None or not is_rate_limit_error(e) or attempt == self.retries:
+                    raise
+                self.limiter.backoff(e)
+                continue
+            self.limiter.settle(estimated, final)
+            return
+    
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        estimated = estimate_tokens(input, self.output_tokens)
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire(estimated, llm_priority_var.get())
+            final = None
+            try:
+                async for chunk in self.llm.astream(input, config, **kwargs):
+                    final = chunk if final is None else final + chunk
+                    yield chunk
+            except Exception as e:
+                if final is not None or not is_rate_limit_error(e) or attempt == self.retries:
+                    raise
+                await asyncio.to_thread(self.limiter.backoff, e)
+                continue
+            await asyncio.to_thread(self.limiter.settle, estimated, final)
+            return
+
+
+_store: Optional[BucketStore] = None
+_limiters: Dict[str, ModelRateLimiter] = {}
+_lock = threading.Lock()
+
+
+def rate_limit_enabled() -> bool:
+    return os.getenv("LLM_RATE_LIMIT_ENABLED", "1") != "0"
+
+
+def get_rate_limiter(model_name: str) -> ModelRateLimiter:
+    """
+    Shared limiter for a model. Budgets come from LLM_RPM / LLM_TPM (or
+    LLM_RPM_<MODEL> / LLM_TPM_<MODEL>); without an explicit budget the limits
+    are learned from the provider's response headers.
+    """
+    global _store
+    
+    with _lock:
+        if model_name in _limiters:
+            return _limiters[model_name]
+        
+        if _store is None:
+            _store = BucketStore(os.path.join(cache_dir(), "rate_limits.sqlite3"))
+        
+        suffix = _env_suffix(model_name)
+        rpm = os.getenv(f"LLM_RPM_{suffix}") or os.getenv("LLM_RPM")
+        tpm = os.getenv(f"LLM_TPM_{suffix}") or os.getenv("LLM_TPM")
+        headroom = _env_float("LLM_RATE_LIMIT_HEADROOM", 0.9)
+        
+        _limiters[model_name] = ModelRateLimiter(
+            model_name,
+            _store,
+            rpm=float(rpm) * headroom if rpm else 500 * headroom,
+            tpm=float(tpm) * headroom if tpm else 200_000 * headroom,
+            pinned=bool(rpm or tpm),
+            headroom=headroom,
+        )
+        return _limiters[model_name]
+
+
+def rate_limited(model_name: str, llm: Runnable) -> Runnable:
+    """Put the shared limiter in front of a chat model, unless LLM_RATE_LIMIT_ENABLED=0."""
+    if not rate_limit_enabled():
+        return llm
+    return RateLimitedChatModel(
+        llm,
+        get_rate_limiter(model_name),
+        output_tokens=_env_float("LLM_RATE_LIMIT_OUTPUT_TOKENS", 1000),
+        retries=int(_env_float("LLM_RATE_LIMIT_RETRIES", 3)),
+    )
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    with _lock:
+        limiters = dict(_limiters)
+    if _store is None:
+        return {}
+    
+    buckets = _store.snapshot()
+    return {
+        name: {**buckets.get(name, {}), **limiter.get_stats()}
+        for name, limiter in limiters.items()
+    }
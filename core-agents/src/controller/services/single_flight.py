@@ -0,0 +1,146 @@
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict
+
+from src.controller.services.event_channel import EventChannel
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: while a call for a key is running,
+    later callers with the same key await the same result instead of starting
+    their own run. The run is cancelled once every caller has gone away.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.stats = {
+            "executions": 0,
+            "coalesced": 0,
+            "cancelled": 0,
+        }
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key) if self._calls.get(key) is done else None)
+        else:
+            self.stats["coalesced"] += 1
+        
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: one caller going away must not cancel the shared run
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    # Nobody is left to read the result, stop paying for it.
+                    # Forget the key now: a caller arriving before the task has
+                    # finished cancelling must start a fresh run, not join this one
+                    self.stats["cancelled"] += 1
+                    if self._calls.get(key) is task:
+                        del self._calls[key]
+                    task.cancel()
+
+
+class StreamFanout:
+    """
+    Single-flight for event streams: the first subscriber for a key starts the
+    producer, every concurrent subscriber for that key receives the same event
+    sequence (late subscribers get the earlier events replayed). The producer
+    is cancelled once every subscriber has gone away.
+    """
+    
+    def __init__(self):
+        self._channels: Dict[str, EventChannel] = {}
+        self._producers: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[EventChannel, int] = {}
+        self.stats = {
+            "executions": 0,
+            "coalesced": 0,
+            "cancelled": 0,
+        }
+    
+    def subscribe(
+        self,
+        key: str,
+        producer: Callable[[], AsyncGenerator[Dict[str, Any], None]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        channel = self._channels.get(key)
+        
+        if channel is None:
+            self.stats["executions"] += 1
+            channel = EventChannel()
+            self._channels[key] = channel
+            self._producers[key] = asyncio.ensure_future(self._produce(key, channel, producer))
+        else:
+            self.stats["coalesced"] += 1
+        
+        self._subscribers[channel] = self._subscribers.get(channel, 0) + 1
+        return self._follow(key, channel, self._producers[key])
+    
+    async def _follow(self, key, channel, producer_task) -> AsyncGenerator[Dict[str, Any], None]:
+        try:
+            async with aclosing(channel.subscribe()) as events:
+                async for event in events:
+                    yield event
+        finally:
+            self._subscribers[channel] -= 1
+            if self._subscribers[channel] == 0:
+                del self._subscribers[channel]
+                if not producer_task.done():
+                    # Every client disconnected, stop the run they were watching.
+                    # A subscriber arriving meanwhile starts a fresh producer
+                    self.stats["cancelled"] += 1
+                    self._forget(key, channel)
+                    producer_task.cancel()
+    
+    def _forget(self, key, channel) -> None:
+        if self._channels.get(key) is channel:
+            del self._channels[key]
+            del self._producers[key]
+    
+    async def _produce(self, key, channel, producer) -> None:
+        try:
+            # aclosing: a cancelled producer closes the graph stream right away
+            async with aclosing(producer()) as events:
+                async for event in events:
+                    await channel.publish(event)
+        except Exception as e:
+            logger.exception("stream producer failed")
+            await channel.publish({
+                "event": "error",
+                "message": str(e)
+            })
+        finally:
+            self._forget(key, channel)
+            await channel.close()
+
+
+_single_flight = SingleFlight()
+_stream_fanout = StreamFanout()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
+
+
+def get_stream_fanout() -> StreamFanout:
+    return _stream_fanout
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    return {
+        "calls": _single_flight.stats,
+        "streams": _stream_fanout.stats,
+    }
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Gauge
+
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+APP_IMPORT_SECONDS = Gauge(
+    "app_import_seconds",
+    "Time spent importing the FastAPI app module",
+)
+WARM_UP_SECONDS = Gauge(
+    "app_warm_up_seconds",
+    "Duration of each startup warm-up step",
+    ["step"],
+)
+
+# Loaded by the pipeline on first use or by the warm-up, never at app import
+HEAVY_MODULES = (
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_community",
+    "langgraph",
+    "openai",
+    "anthropic",
+    "numpy",
+    "tiktoken",
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def check_import_budget(module: str, seconds: float) -> Dict[str, Any]:
+    """
+    Compare the import time of the app module with IMPORT_TIME_BUDGET_S and
+    report heavy modules that were imported eagerly. Logs a warning when over
+    budget; raises when IMPORT_TIME_BUDGET_STRICT=1 (CI).
+    """
+    budget = _env_float("IMPORT_TIME_BUDGET_S", 1.5)
+    eager = loaded_heavy_modules()
+    report = {"app_module": module, "seconds": round(seconds, 3), "budget_s": budget, "eager_heavy_modules": eager}
+    
+    APP_IMPORT_SECONDS.set(seconds)
+    if seconds <= budget and not eager:
+        logger.info("app imported", extra=report)
+        return report
+    
+    logger.warning("app import over budget", extra=report)
+    if os.getenv("IMPORT_TIME_BUDGET_STRICT", "0") == "1":
+        raise RuntimeError(f"Importing {module} took {seconds:.2f}s (budget {budget}s), eager: {eager}")
+    return report
+
+
+class Readiness:
+    """
+    Startup state reported by /status-check: "starting" until the warm-up
+    runs, "warming" while it does, then "ready". Only the pipeline is
+    required: it is retried with backoff and the state is "failed" when it
+    never builds. Cache and connection warm-up failures are kept in
+    `warnings` and the app is ready anyway, as those are opened lazily on
+    first use.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.steps: Dict[str, float] = {}
+        self.warnings: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+    
+    def _step_done(self, step: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        WARM_UP_SECONDS.labels(step).set(elapsed)
+        with self._lock:
+            self.steps[step] = round(elapsed, 3)
+    
+    async def _build_pipeline(self):
+        """init_pipeline in a thread, WARMUP_PIPELINE_ATTEMPTS times with doubling delays."""
+        from src.controller.agents.pipeline import init_pipeline
+        
+        attempts = max(1, int(_env_float("WARMUP_PIPELINE_ATTEMPTS", 4)))
+        delay = _env_float("WARMUP_RETRY_DELAY_S", 1.0)
+        for attempt in range(1, attempts + 1):
+            try:
+                return await asyncio.to_thread(init_pipeline)
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                logger.warning("pipeline warm-up failed, retrying", extra={"attempt": attempt, "error": str(e)})
+                await asyncio.sleep(delay)
+                delay *= 2
+    
+    async def _optional_step(self, step: str, warm) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await warm()
+        except Exception as e:
+            logger.warning("warm-up step failed", extra={"step": step, "error": str(e)})
+            with self._lock:
+                self.warnings[step] = str(e)
+            return None
+        self._step_done(step, start)
+        return result
+    
+    async def warm_up(self) -> None:
+        """
+        Build the pipeline (imports langchain/langgraph, builds the routed models
+        and compiles the graphs) in a thread so the event loop keeps answering
+        /status-check, open the caches and pre-open pooled LLM connections.
+        """
+        self.state = "warming"
+        try:
+            start = time.perf_counter()
+            pipeline = await self._build_pipeline()
+            self._step_done("pipeline", start)
+        except Exception as e:
+            logger.exception("warm-up failed")
+            self.state = "failed"
+            self.error = str(e)
+            return
+        
+        async def caches():
+            from src.controller.cache.result_cache import get_result_cache
+            from src.controller.cache.stage_cache import get_stage_cache
+            from src.controller.cache.semantic_cache import get_semantic_cache
+            
+            await asyncio.to_thread(get_result_cache)
+            await asyncio.to_thread(get_stage_cache)
+            await asyncio.to_thread(get_semantic_cache, pipeline.version)
+        
+        async def connections():
+            from src.controller.clients.llm_clients import warm_connections
+            
+            return await warm_connections(int(_env_float("WARMUP_CONNECTIONS", 2)))
+        
+        await self._optional_step("caches", caches)
+        warmed = await self._optional_step("connections", connections)
+        
+        self.state = "ready"
+        logger.info("warm-up finished", extra={"steps": self.steps, "warnings": self.warnings, "connections": warmed})
+    
+    def start(self) -> None:
+        """
+        Run the warm-up per WARMUP_ENABLED (default 1) in the background;
+        disabled, the app is ready at once and builds the pipeline on the
+        first request.
+        """
+        if os.getenv("WARMUP_ENABLED", "1") == "0":
+            self.state = "ready"
+            return
+        self._task = asyncio.get_running_loop().create_task(self.warm_up())
+    
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            steps, warnings = dict(self.steps), dict(self.warnings)
+        return {"state": self.state, "error": self.error, "steps": steps, "warnings": warnings}
+
+
+_readiness = Readiness()
+
+
+def get_readiness() -> Readiness:
+    return _readiness
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+# Set per HTTP request (or per job) and attached to every log record
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request id and any `extra` fields."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": request_id_var.get(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging() -> None:
+    """Route the app's loggers to stdout as JSON lines. LOG_LEVEL sets the level."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    
+    logger = logging.getLogger("cryptomataz")
+    logger.handlers = [handler]
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"cryptomataz.{name}")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware: takes X-Request-ID from the client (or creates one), makes
+    it available to every log call of the request and echoes it back.
+    Pure ASGI so SSE/NDJSON responses are not buffered.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode() or new_request_id()
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = {}
+        
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode())
+                ]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            get_logger("http").info(
+                "request finished",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status.get("code"),
+                    "duration_s": round(time.perf_counter() - start, 4),
+                }
+            )
+            request_id_var.reset(token)
@@ -0,0 +1,354 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from src.controller.services.metrics import (
+    SANDBOX_DURATION,
+    SANDBOX_RECYCLES,
+    SANDBOX_RUNS,
+    SANDBOX_WORKERS,
+    SANDBOX_WORKERS_BUSY,
+)
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class SandboxSettings:
+    """Limits for the python_repl_tool worker pool."""
+    
+    workers: int = 2
+    timeout_s: float = 10.0
+    cpu_s: int = 5
+    memory_mb: int = 512
+    max_output_chars: int = 8000
+    max_tasks_per_worker: int = 50
+    
+    @classmethod
+    def from_env(cls) -> "SandboxSettings":
+        """Read PYTHON_SANDBOX_* variables, e.g. PYTHON_SANDBOX_TIMEOUT_S."""
+        return cls(
+            workers=_env_int("PYTHON_SANDBOX_WORKERS", cls.workers),
+            timeout_s=_env_float("PYTHON_SANDBOX_TIMEOUT_S", cls.timeout_s),
+            cpu_s=_env_int("PYTHON_SANDBOX_CPU_S", cls.cpu_s),
+            memory_mb=_env_int("PYTHON_SANDBOX_MEMORY_MB", cls.memory_mb),
+            max_output_chars=_env_int("PYTHON_SANDBOX_MAX_OUTPUT", cls.max_output_chars),
+            max_tasks_per_worker=_env_int("PYTHON_SANDBOX_MAX_TASKS", cls.max_tasks_per_worker),
+        )
+
+
+@dataclass
+class SandboxResult:
+    """
+    Outcome of one snippet. status is "ok", "error" (the snippet raised),
+    "timeout" (wall clock), "cpu_limit", "memory_limit", "crashed" (the worker
+    died) or "busy" (no worker freed up within the timeout).
+    """
+    
+    status: str
+    output: str = ""
+    error: Optional[str] = None
+    truncated: bool = False
+    duration_s: float = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class _CpuLimitExceeded(BaseException):
+    """Raised from SIGXCPU; BaseException so snippets catching Exception do not swallow it."""
+
+
+class _BoundedWriter(io.TextIOBase):
+    """stdout/stderr that keeps the first `limit` characters and drops the rest."""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if len(text) > room:
+            self.truncated = True
+            text = text[:max(room, 0)]
+        if text:
+            self.parts.append(text)
+            self.size += len(text)
+        return len(text)
+    
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+
+def _on_sigxcpu(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_soft_limit(seconds) -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY and seconds != resource.RLIM_INFINITY:
+        seconds = min(seconds, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, hard))
+
+
+def _execute(code: str, cpu_s: int, max_output_chars: int) -> Dict[str, Any]:
+    output = _BoundedWriter(max_output_chars)
+    status, error = "ok", None
+    
+    # RLIMIT_CPU counts the whole process lifetime: allow cpu_s more from now
+    _set_cpu_soft_limit(int(_cpu_used()) + cpu_s + 1)
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            # Fresh globals per call: snippets do not see each other's state,
+            # which python_repl_tool's description tells the model
+            exec(compile(code, "<sandbox>", "exec"), {"__name__": "__main__"})
+    except _CpuLimitExceeded:
+        status, error = "cpu_limit", f"CPU time limit of {cpu_s}s exceeded"
+    except MemoryError:
+        status, error = "memory_limit", "Memory limit exceeded"
+    except BaseException as e:
+        status, error = "error", repr(e)
+    finally:
+        _set_cpu_soft_limit(resource.RLIM_INFINITY)
+    
+    return {"status": status, "output": output.getvalue(), "error": error, "truncated": output.truncated}
+
+
+def _worker_main(conn, memory_mb: int) -> None:
+    """Worker loop: run (code, cpu_s, max_output_chars) requests until None or EOF."""
+    # Address space cap, inherited by anything the snippet spawns
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    # Ctrl-C on the server must not print a traceback from every worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        conn.send(_execute(*request))
+
+
+class _Worker:
+    def __init__(self, context, memory_mb: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_mb),
+            name="python-sandbox",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+    
+    def stop(self, kill: bool = False) -> None:
+        if kill or not self.process.is_alive():
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                self.process.kill()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PythonSandbox:
+    """
+    Pre-started pool of worker processes for python_repl_tool. Each snippet
+    runs in a worker with a CPU time limit (RLIMIT_CPU), an address space cap
+    (RLIMIT_AS) and a wall-clock timeout after which the worker is killed, so
+    a runaway snippet cannot hold the server's interpreter or GIL. Workers are
+    replaced after a timeout, limit hit or crash, and recycled after
+    max_tasks_per_worker snippets.
+    
+    Unlike PythonREPL, every snippet starts from empty globals: a snippet may
+    land on any worker, and workers are replaced, so state could not be kept
+    reliably anyway.
+    
+    This isolates resources, not privileges: the code runs as the server's user.
+    """
+    
+    def __init__(self, settings: Optional[SandboxSettings] = None):
+        self.settings = settings or SandboxSettings.from_env()
+        # forkserver: workers fork from a clean server process, not from the
+        # app with its threads and open sockets
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._busy = 0
+        self._closed = False
+        self.stats = {"runs": 0, "recycled": 0}
+    
+    def start(self) -> "PythonSandbox":
+        for _ in range(self.settings.workers):
+            self._add_worker()
+        return self
+    
+    def _add_worker(self) -> None:
+        worker = _Worker(self._context, self.settings.memory_mb)
+        with self._lock:
+            self._workers += 1
+            SANDBOX_WORKERS.set(self._workers)
+        self._idle.put(worker)
+    
+    def _retire(self, worker: _Worker, reason: str, kill: bool = False) -> None:
+        worker.stop(kill=kill)
+        SANDBOX_RECYCLES.labels(reason).inc()
+        with self._lock:
+            self._workers -= 1
+            self.stats["recycled"] += 1
+            SANDBOX_WORKERS.set(self._workers)
+            closed = self._closed
+        if not closed:
+            self._add_worker()
+    
+    def run_sync(self, code: str) -> SandboxResult:
+        """Run a snippet, blocking the calling thread (not the GIL) until it finishes."""
+        start = time.perf_counter()
+        try:
+            worker = self._idle.get(timeout=self.settings.timeout_s)
+        except queue.Empty:
+            return self._record(SandboxResult("busy", error="All sandbox workers are busy"), start)
+        
+        with self._lock:
+            self._busy += 1
+            SANDBOX_WORKERS_BUSY.set(self._busy)
+        try:
+            result, retire = self._run_on(worker, code)
+        finally:
+            with self._lock:
+                self._busy -= 1
+                SANDBOX_WORKERS_BUSY.set(self._busy)
+        
+        worker.tasks += 1
+        if retire:
+            self._retire(worker, result.status, kill=result.status in ("timeout", "crashed"))
+        elif worker.tasks >= self.settings.max_tasks_per_worker:
+            self._retire(worker, "max_tasks")
+        elif self._closed:
+            self._retire(worker, "closed")
+        else:
+            self._idle.put(worker)
+        
+        return self._record(result, start)
+    
+    def _run_on(self, worker: _Worker, code: str):
+        """(result, whether the worker must be replaced)"""
+        settings = self.settings
+        try:
+            worker.conn.send((code, settings.cpu_s, settings.max_output_chars))
+            if not worker.conn.poll(settings.timeout_s):
+                return SandboxResult("timeout", error=f"Timed out after {settings.timeout_s}s"), True
+            reply = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            # Killed by the kernel (e.g. the hard CPU limit) or the snippet exited the process
+            worker.process.join(timeout=1)
+            return SandboxResult("crashed", error=f"Sandbox worker exited with code {worker.process.exitcode}"), True
+        
+        result = SandboxResult(**reply)
+        # A worker that ran out of CPU or memory may be left in a broken state
+        return result, result.status in ("cpu_limit", "memory_limit")
+    
+    def _record(self, result: SandboxResult, start: float) -> SandboxResult:
+        result.duration_s = round(time.perf_counter() - start, 3)
+        SANDBOX_RUNS.labels(result.status).inc()
+        SANDBOX_DURATION.observe(result.duration_s)
+        with self._lock:
+            self.stats["runs"] += 1
+        if not result.ok:
+            logger.info("sandbox run failed", extra={"sandbox": asdict(result)})
+        return result
+    
+    async def run(self, code: str) -> SandboxResult:
+        """Run a snippet without blocking the event loop."""
+        return await asyncio.to_thread(self.run_sync, code)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._workers -= 1
+        SANDBOX_WORKERS.set(self._workers)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "workers": self._workers,
+                "busy": self._busy,
+                "idle": self._workers - self._busy,
+            }
+
+
+_sandbox: Optional[PythonSandbox] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_python_sandbox() -> PythonSandbox:
+    """Process-wide sandbox pool, started on first use."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = PythonSandbox().start()
+        return _sandbox
+
+
+def get_sandbox_stats() -> Dict[str, Any]:
+    """Pool stats, empty until something has used the sandbox."""
+    return _sandbox.get_stats() if _sandbox is not None else {}
+
+
+def shutdown_python_sandbox() -> None:
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is not None:
+            _sandbox.close()
+            _sandbox = None
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+
+from src.controller.cache.result_cache import TwoTierCache, build_two_tier_cache, make_cache_key, normalize_topic
+from src.controller.services.metrics import WEB_SEARCH_LATENCY, WEB_SEARCH_LOOKUPS
+from src.controller.services.single_flight import SingleFlight
+from src.controller.services.structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so rephrasings of the same query share a key."""
+    return normalize_topic(query).rstrip("?.!")
+
+
+class SearchBackend(Protocol):
+    """Anything that answers a query with a list of {"url", "content"} results."""
+    
+    name: str
+    
+    async def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        ...
+
+
+class TavilyBackend:
+    """Tavily search API through langchain_community, needs TAVILY_API_KEY."""
+    
+    name = "tavily"
+    
+    def __init__(self):
+        self._tools: Dict[int, Any] = {}
+    
+    def _tool(self, max_results: int):
+        if max_results not in self._tools:
+            from langchain_community.tools.tavily_search import TavilySearchResults
+            
+            self._tools[max_results] = TavilySearchResults(max_results=max_results)
+        return self._tools[max_results]
+    
+    async def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        results = await self._tool(max_results).ainvoke({"query": query})
+        if isinstance(results, str):
+            # The tool reports API errors as a string instead of raising
+            raise RuntimeError(results)
+        return results
+
+
+class LocalIndexBackend:
+    """
+    Stand-in for tests and benchmarks: ranks a fixed list of {"url",
+    "content"} documents by how many query words they contain. latency_ms
+    simulates the round trip of a real search API.
+    """
+    
+    name = "local"
+    
+    def __init__(self, documents: Sequence[Dict[str, Any]], latency_ms: float = 0.0):
+        self.documents = list(documents)
+        self.latency_ms = latency_ms
+        self.calls = 0
+    
+    @classmethod
+    def from_file(cls, path: str, latency_ms: float = 0.0) -> "LocalIndexBackend":
+        with open(path) as f:
+            return cls(json.load(f), latency_ms)
+    
+    async def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        
+        words = set(re.findall(r"\w+", query.lower()))
+        scored = []
+        for doc in self.documents:
+            score = len(words & set(re.findall(r"\w+", doc["content"].lower())))
+            if score:
+                scored.append((score, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in scored[:max_results]]
+
+
+class WebSearch:
+    """
+    Search wrapper for the researcher worker. Results are cached by
+    normalized query (memory LRU + the shared SQLite tier, so repeats across
+    runs and workers are free), identical queries in flight on the same event
+    loop share one backend call, and search_many fans several queries out in
+    parallel, at most `concurrency` at a time.
+    """
+    
+    def __init__(
+        self,
+        backend: SearchBackend,
+        cache: Optional[TwoTierCache] = None,
+        max_results: int = 5,
+        concurrency: int = 4
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.max_results = max_results
+        self.concurrency = concurrency
+        # SingleFlight tasks belong to one event loop; sync callers all share one
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SingleFlight]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"searches": 0, "cache_hits": 0, "backend_calls": 0, "errors": 0}
+    
+    def _single_flight(self) -> SingleFlight:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._flights:
+                self._flights[loop] = SingleFlight()
+            return self._flights[loop]
+    
+    def key(self, query: str) -> str:
+        return make_cache_key("web_search", self.backend.name, self.max_results, normalize_query(query))
+    
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+    
+    async def search(self, query: str) -> List[Dict[str, Any]]:
+        key = self.key(query)
+        self._count("searches")
+        
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                WEB_SEARCH_LOOKUPS.labels(self.backend.name, "cache_hit").inc()
+                return cached
+        
+        async def call():
+            self._count("backend_calls")
+            WEB_SEARCH_LOOKUPS.labels(self.backend.name, "backend").inc()
+            start = time.perf_counter()
+            try:
+                results = await self.backend.search(query, self.max_results)
+            finally:
+                WEB_SEARCH_LATENCY.labels(self.backend.name).observe(time.perf_counter() - start)
+            if self.cache is not None:
+                await self.cache.set(key, results)
+            return results
+        
+        return await self._single_flight().do(key, call)
+    
+    async def search_many(self, queries: Sequence[str]) -> Dict[str, Any]:
+        """
+        Results per query, in the order given. A failing query maps to
+        {"error": ...} so one bad search does not sink the others.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def one(query):
+            async with semaphore:
+                try:
+                    return await self.search(query)
+                except Exception as e:
+                    self._count("errors")
+                    logger.warning("web search failed", extra={"query": query, "error": str(e)})
+                    return {"error": str(e)}
+        
+        # Exact repeats are answered once; rephrasings that normalize to the
+        # same query share the backend call through the single-flight
+        unique = list(dict.fromkeys(queries))
+        results = await asyncio.gather(*(one(query) for query in unique))
+        return dict(zip(unique, results))
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="web-search", daemon=True).start()
+                self._sync_loop = loop
+            return self._sync_loop
+    
+    def search_many_sync(self, queries: Sequence[str]) -> Dict[str, Any]:
+        """
+        search_many for sync callers (graph nodes run with invoke, possibly
+        from a thread whose event loop is running). Every sync call runs on
+        one background loop, so identical queries from concurrent calls
+        share a backend call too.
+        """
+        future = asyncio.run_coroutine_threadsafe(self.search_many(queries), self._background_loop())
+        return future.result()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
+
+
+def build_backend() -> SearchBackend:
+    """
+    WEB_SEARCH_BACKEND picks the backend: "tavily" (default) or "local",
+    which serves WEB_SEARCH_LOCAL_INDEX (a JSON list of {"url", "content"})
+    with WEB_SEARCH_LOCAL_LATENCY_MS of simulated latency.
+    """
+    backend = os.getenv("WEB_SEARCH_BACKEND", "tavily")
+    if backend == "local":
+        return LocalIndexBackend.from_file(
+            os.environ["WEB_SEARCH_LOCAL_INDEX"],
+            float(os.getenv("WEB_SEARCH_LOCAL_LATENCY_MS", "0"))
+        )
+    if backend == "tavily":
+        return TavilyBackend()
+    raise ValueError(f"Unknown WEB_SEARCH_BACKEND {backend!r}")
+
+
+_web_search: Optional[WebSearch] = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> WebSearch:
+    """
+    Process-wide search wrapper. The cache is configured from
+    WEB_SEARCH_CACHE_MAX_SIZE / _TTL_SECONDS / _DISK and turned off with
+    WEB_SEARCH_CACHE_ENABLED=0.
+    """
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            cache = None
+            if os.getenv("WEB_SEARCH_CACHE_ENABLED", "1") != "0":
+                cache = build_two_tier_cache("web_search", "WEB_SEARCH_CACHE")
+            _web_search = WebSearch(
+                build_backend(),
+                cache,
+                max_results=_env_int("WEB_SEARCH_MAX_RESULTS", 5),
+                concurrency=_env_int("WEB_SEARCH_CONCURRENCY", 4)
+            )
+        return _web_search
+
+
+def get_web_search_stats() -> Dict[str, Any]:
+    """Search stats, empty until the researcher has searched."""
+    return _web_search.get_stats() if _web_search is not None else {}
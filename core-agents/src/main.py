@@ -1,15 +1,57 @@
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+load_dotenv()
+
+# Only light modules here: langchain, langgraph, the SDKs and numpy are
+# imported by the startup warm-up (or the first request), see services/startup.py
+from src.controller.clients.llm_clients import aclose_clients
+from src.controller.services.job_queue import get_job_manager
+from src.controller.cache.result_cache import get_result_cache
+from src.controller.cache.stage_cache import get_stage_cache
+from src.controller.services.single_flight import get_coalescing_stats
+from src.controller.agents.supervisor_router import get_router_stats
+from src.controller.services.metrics import register_stats
+from src.controller.services.startup import check_import_budget, get_readiness
+from src.controller.services.structured_logging import RequestIdMiddleware, configure_logging
+from src.controller.tools.python_sandbox import get_sandbox_stats, shutdown_python_sandbox
+from src.controller.tools.web_search import get_web_search_stats
 from src.routes import (
     status_check,
-    supervisor_agent
+    supervisor_agent,
+    supervisor_jobs
 )
 
-load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the compiled graphs, LLM clients, caches and pooled connections in
+    # the background; /status-check reports ready once done
+    get_readiness().start()
+    # Worker pool for /supervisor-agent/jobs
+    get_job_manager().start()
+    yield
+    await get_job_manager().stop()
+    await get_readiness().stop()
+    # Close the pooled OpenAI/Anthropic connections
+    await aclose_clients()
+    # Stop the python_repl_tool workers, if anything started them
+    shutdown_python_sandbox()
+
+
+configure_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+# Request id on every log line and response
+app.add_middleware(RequestIdMiddleware)
 
 # Configure CORS to allow requests from frontend
 app.add_middleware(
@@ -26,5 +68,38 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+def _semantic_cache_stats():
+    from src.controller.agents.pipeline import get_pipeline
+    from src.controller.cache.semantic_cache import get_semantic_cache
+    
+    semantic = get_semantic_cache(get_pipeline().version)
+    return semantic.get_stats() if semantic is not None else {}
+
+
+def _rate_limit_stats():
+    from src.controller.services.rate_limiter import get_rate_limit_stats
+    
+    return get_rate_limit_stats()
+
+
+# Cache, single-flight, job and rate limiter stats as gauges on /metrics.
+# The pipeline-backed sources are skipped until the warm-up has built it.
+register_stats({
+    "result_cache": lambda: get_result_cache().get_stats(),
+    "stage_cache": lambda: get_stage_cache().get_stats(),
+    "semantic_cache": lambda: _semantic_cache_stats() if get_readiness().ready else {},
+    "coalescing": get_coalescing_stats,
+    "jobs": lambda: get_job_manager().get_stats(),
+    "rate_limits": lambda: _rate_limit_stats() if get_readiness().ready else {},
+    "startup": lambda: get_readiness().to_dict(),
+    "python_sandbox": get_sandbox_stats,
+    "web_search": get_web_search_stats,
+    "supervisor_router": get_router_stats,
+})
+
 app.include_router(status_check.router)
 app.include_router(supervisor_agent.router)
+app.include_router(supervisor_jobs.router)
+
+# Warns (or fails with IMPORT_TIME_BUDGET_STRICT=1) when the app got heavy to import
+check_import_budget(__name__, time.perf_counter() - _import_started)
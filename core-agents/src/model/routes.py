@@ -1,7 +1,45 @@
+from typing import List, Literal, Optional
+
 from pydantic import BaseModel, Field
 
 class SupervisorAgentRequest(BaseModel):
     topic_context: str = Field(
         description="Main topic or theme for the weekly Twitter content",
         example="AI automation for small businesses"
-    )
\ No newline at end of file
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Streaming only: also emit agent_delta events with LLM tokens and partial JSON"
+    )
+    mode: Literal["full", "express"] = Field(
+        default="full",
+        description="full: Strategist, Creator and Optimizer agents; express: one merged LLM call, lower latency"
+    )
+
+
+class SupervisorAgentBatchRequest(BaseModel):
+    items: List[SupervisorAgentRequest] = Field(
+        description="One generation request per account",
+        min_length=1
+    )
+    max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=32,
+        description="How many items may run through the pipeline at the same time"
+    )
+
+
+class RegenerateTweetRequest(BaseModel):
+    result_id: str = Field(
+        description="result_id of a previous /supervisor-agent response (or of a regenerated one)"
+    )
+    tweet_index: int = Field(
+        ge=0,
+        description="Position of the rejected tweet in the response's tweets"
+    )
+    feedback: Optional[str] = Field(
+        default=None,
+        max_length=500,
+        description="Why the tweet was rejected, passed to the model as the editor's note"
+    )
@@ -1,13 +1,34 @@
 from datetime import datetime
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from fastapi.responses import JSONResponse
+
+from src.controller.services.metrics import render_metrics
+from src.controller.services.startup import get_readiness
 
 router = APIRouter()
 
 @router.get("/status-check")
 async def healthcheck():
-    return {
-        "status": "OK",
+    """
+    Readiness: 503 with status "WARMING" until the startup warm-up has built
+    the pipeline, then "OK". Cache or connection warm-up failures do not
+    block readiness; they are listed in startup.warnings.
+    """
+    readiness = get_readiness()
+    body = {
+        "status": "OK" if readiness.ready else "WARMING",
         "timestamp": datetime.now().isoformat(),
         "api_cryptomataz_version": "0.0.1",
+        "startup": readiness.to_dict(),
     }
+    if not readiness.ready:
+        return JSONResponse(body, status_code=503)
+    return body
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics: node/LLM latency, tokens, parse failures, in-flight requests, caches and jobs."""
+    data, content_type = render_metrics()
+    return Response(content=data, media_type=content_type)
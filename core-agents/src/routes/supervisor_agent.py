@@ -1,16 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import ValidationError
 import json
-import asyncio
 
-from src.controller.agents.supervisor_agent import supervisor_agent, supervisor_agent_stream
-from src.model.routes import SupervisorAgentRequest
+from src.controller.cache.result_cache import get_result_cache
+from src.controller.services.cancellation import ClientDisconnected, cancel_on_disconnect
+from src.controller.services.single_flight import get_coalescing_stats
+from src.controller.services.metrics import track_in_flight
+from src.controller.services.structured_logging import get_logger
+from src.model.routes import SupervisorAgentRequest, SupervisorAgentBatchRequest, RegenerateTweetRequest
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 @router.post("/supervisor-agent/")
-async def supervisor_agent_endpoint(request: SupervisorAgentRequest):
+async def supervisor_agent_endpoint(request: SupervisorAgentRequest, http_request: Request):
     """
     Generate viral Twitter content for a full week based on a given topic.
     
@@ -20,19 +24,31 @@ async def supervisor_agent_endpoint(request: SupervisorAgentRequest):
     - Quality Optimizer: Refines and optimizes all content
     
     Returns 14-21 optimized tweets (2-3 per day) ready to post.
+    
+    mode "express" does the three steps in a single LLM call for lower
+    latency; the response has the same shape.
+    
+    If the client disconnects before the result is ready, the run is cancelled
+    (unless identical requests are still waiting on it).
     """
+    # Heavy (langchain/langgraph), imported on first use or by the startup warm-up
+    from src.controller.agents.supervisor_agent import supervisor_agent
+    
     try:
-        print("-- Supervisor Endpoint --")
-        print("topic_context:", request.topic_context)
-        response = await supervisor_agent(request.topic_context)
+        logger.info("supervisor endpoint", extra={"topic_context": request.topic_context, "mode": request.mode})
+        with track_in_flight("supervisor_agent"):
+            response = await cancel_on_disconnect(http_request, supervisor_agent(request.topic_context, request.mode))
         return {
             "data": response
         }
+    except ClientDisconnected:
+        # Nobody reads this; 499 is the nginx convention for client closed request
+        return Response(status_code=499)
     except ValidationError as e:
-        print("Validation error:", e)
+        logger.warning("validation error", extra={"error": str(e)})
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        print("Exception:", e)
+        logger.exception("supervisor endpoint failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -47,35 +63,42 @@ async def supervisor_agent_stream_endpoint(request: SupervisorAgentRequest):
     Events emitted:
     - workflow_started: When the workflow begins
     - agent_started: When an agent starts execution
+    - agent_delta: LLM tokens and partial output (when incremental is true)
     - agent_completed: When an agent finishes execution
     - final_result: Final optimized content
     - error: If an error occurs
     
-    Use EventSource on the frontend to listen to these events.
+    Use EventSource on the frontend to listen to these events. In express mode
+    the only agent is "express".
+    
+    Closing the connection cancels the run once no other identical stream is
+    subscribed to it.
     """
+    from src.controller.agents.supervisor_agent import supervisor_agent_stream
+    
     async def event_generator():
         try:
-            print("-- Supervisor Streaming Endpoint --")
-            print("topic_context:", request.topic_context)
+            logger.info(
+                "supervisor streaming endpoint",
+                extra={"topic_context": request.topic_context, "incremental": request.incremental, "mode": request.mode}
+            )
             
-            # Stream events from the supervisor agent
-            async for event in supervisor_agent_stream(request.topic_context):
-                # Format as SSE (Server-Sent Events)
-                event_data = json.dumps(event)
-                yield f"data: {event_data}\n\n"
-                
-                # Small delay to ensure smooth streaming
-                await asyncio.sleep(0.1)
+            with track_in_flight("supervisor_agent_stream"):
+                # Stream events from the supervisor agent
+                async for event in supervisor_agent_stream(request.topic_context, request.incremental, request.mode):
+                    # Format as SSE (Server-Sent Events)
+                    event_data = json.dumps(event)
+                    yield f"data: {event_data}\n\n"
                 
         except ValidationError as e:
-            print("Validation error:", e)
+            logger.warning("validation error", extra={"error": str(e)})
             error_event = json.dumps({
                 "event": "error",
                 "message": f"Validation error: {str(e)}"
             })
             yield f"data: {error_event}\n\n"
         except Exception as e:
-            print("Exception:", e)
+            logger.exception("supervisor streaming endpoint failed")
             error_event = json.dumps({
                 "event": "error",
                 "message": str(e)
@@ -91,3 +114,110 @@ async def supervisor_agent_stream_endpoint(request: SupervisorAgentRequest):
             "X-Accel-Buffering": "no",  # Disable buffering in nginx
         }
     )
+
+
+@router.post("/supervisor-agent/batch")
+async def supervisor_agent_batch_endpoint(request: SupervisorAgentBatchRequest):
+    """
+    Generate content for many topics in one call.
+    
+    Items run through the pipeline with at most max_concurrency in flight and
+    are streamed back as NDJSON (one JSON object per line) as each one finishes:
+    - {"index": int, "data": dict, "cached": bool}: result for items[index]
+    - {"index": int, "error": str}: items[index] failed, the rest keep running
+    """
+    from src.controller.agents.supervisor_agent import supervisor_agent_batch
+    
+    async def ndjson_generator():
+        logger.info("supervisor batch endpoint", extra={"items": len(request.items)})
+        
+        topics = [item.topic_context for item in request.items]
+        modes = [item.mode for item in request.items]
+        
+        with track_in_flight("supervisor_agent_batch"):
+            async for result in supervisor_agent_batch(topics, request.max_concurrency, modes):
+                yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(
+        ndjson_generator(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable buffering in nginx
+        }
+    )
+
+
+@router.post("/supervisor-agent/regenerate")
+async def supervisor_agent_regenerate_endpoint(request: RegenerateTweetRequest):
+    """
+    Replace one tweet of a previous result without re-running the pipeline.
+    
+    Reuses the strategy and sibling tweets stored with result_id and makes a
+    single LLM call for the rejected slot. Returns the patched result (with a
+    new result_id, for further edits), the replaced tweet and the tokens the
+    regeneration cost next to those of the full run.
+    
+    404 when the result_id is unknown or expired, 422 when tweet_index is out
+    of range.
+    """
+    from src.controller.agents.supervisor_agent import ResultNotFound, TweetIndexOutOfRange, regenerate_tweet
+    
+    try:
+        logger.info(
+            "regenerate endpoint",
+            extra={"result_id": request.result_id, "tweet_index": request.tweet_index}
+        )
+        with track_in_flight("supervisor_agent_regenerate"):
+            return await regenerate_tweet(request.result_id, request.tweet_index, request.feedback)
+    except ResultNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TweetIndexOutOfRange as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValidationError as e:
+        logger.warning("validation error", extra={"error": str(e)})
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.exception("regenerate endpoint failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/supervisor-agent/cache/stats")
+async def supervisor_agent_cache_stats_endpoint():
+    """
+    Hit/miss statistics of the /supervisor-agent result cache for this worker.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "stats": cache.get_stats()
+    }
+
+
+@router.get("/supervisor-agent/semantic-cache/stats")
+async def supervisor_agent_semantic_cache_stats_endpoint():
+    """
+    Hit rates of the semantic cache (full result vs strategy reuse) and the
+    similarity distribution of recent lookups, for tuning the thresholds.
+    """
+    from src.controller.agents.pipeline import get_pipeline
+    from src.controller.cache.semantic_cache import get_semantic_cache
+    
+    semantic = get_semantic_cache(get_pipeline().version)
+    if semantic is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "stats": semantic.get_stats()
+    }
+
+
+@router.get("/supervisor-agent/coalescing/stats")
+async def supervisor_agent_coalescing_stats_endpoint():
+    """
+    How many pipeline runs were started and how many identical in-flight
+    requests were coalesced onto them, for blocking calls and SSE streams.
+    """
+    return get_coalescing_stats()
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+import json
+
+from src.controller.services.job_queue import QueueFullError, get_job_manager
+from src.controller.services.structured_logging import get_logger
+from src.model.routes import SupervisorAgentRequest
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.post("/supervisor-agent/jobs", status_code=202)
+async def create_supervisor_job_endpoint(request: SupervisorAgentRequest):
+    """
+    Queue a supervisor agent run and return its job id right away.
+    
+    Poll GET /supervisor-agent/jobs/{job_id} for the status and result, or attach
+    to GET /supervisor-agent/jobs/{job_id}/stream for the SSE events.
+    Returns 429 with Retry-After when the queue is full.
+    """
+    logger.info("supervisor job endpoint", extra={"topic_context": request.topic_context})
+    
+    try:
+        job = get_job_manager().submit(request.topic_context, request.incremental, request.mode)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    return {
+        "job_id": job.id,
+        "status": job.status
+    }
+
+
+@router.get("/supervisor-agent/jobs/{job_id}")
+async def get_supervisor_job_endpoint(job_id: str):
+    """
+    Status of a job. "result" holds the same data as the final_result event
+    once the job is completed.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+
+@router.get("/supervisor-agent/jobs/{job_id}/stream")
+async def stream_supervisor_job_endpoint(job_id: str):
+    """
+    Attach to a job's Server-Sent Events. Uses the same events as
+    /supervisor-agent/stream; events emitted before attaching are replayed first.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_generator():
+        async for event in job.channel.subscribe():
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable buffering in nginx
+        }
+    )
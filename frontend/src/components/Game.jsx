@@ -1010,7 +1010,8 @@ const Game = () => {
       console.log('Starting SSE connection...');
       
       // Create request body
-      const requestBody = JSON.stringify({ topic_context: topicContext });
+      // incremental: also stream partial tweets as agent_delta events
+      const requestBody = JSON.stringify({ topic_context: topicContext, incremental: true });
       
       // Use fetch with streaming for SSE
       const response = await fetch(SUPERVISOR_AGENT_STREAM_ENDPOINT, {
@@ -1081,6 +1082,19 @@ const Game = () => {
                   }, 2000); // Wait 2 seconds for supervisor to reach target
                   break;
                   
+                case 'agent_delta':
+                  // Show the week's tweets as they are being written: the
+                  // creator's drafts, then the optimizer's rewrites in place
+                  if (data.tweets) {
+                    setOutput({
+                      data: {
+                        tweets: data.tweets,
+                        tips: data.partial?.key_tips,
+                      },
+                    });
+                  }
+                  break;
+                  
                 case 'final_result':
                   console.log('Final result received');
                   setOutput({ data: data.data });